@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+#
+# Shamir timings: python3 benchmarks/bench_shamir.py [-r repeat]
+#
+import os
+import sys
+import time
+import optparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shamir import Shamir, widthSets
+from prng import Prng
+
+
+def timeit(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def legacyFPoly(x, poly, prime):
+    result = 0
+    for i in range(len(poly)):
+        result += poly[i] * x ** i
+    return result % prime
+
+
+def benchSplit(repeat):
+    print("split (best of %d)" % repeat)
+    print("%6s %4s %6s %12s %12s %12s" % ("width", "k", "n", "split (ms)", "eval (ms)", "legacy (ms)"))
+    # k is stored in a nibble by ShareProtocolV1, x coordinates are 16 bits: n = 65535 is the maximum,
+    # where drawing distinct x coordinates (about n ln n 16-bit draws) dominates the split
+    for (width, prime) in widthSets:
+        for (k, n) in [(2, 3), (8, 15), (15, 15), (15, 255), (15, 65535)]:
+            shamir = Shamir(k=k, n=n, width=width)
+            secret = (1 << (width - 1)) % prime
+            shares = shamir.split(secret)
+            poly = [secret] + [(secret * (i + 7)) % prime for i in range(1, k)]
+            xs = [x for (x, _) in shares]
+            split = timeit(lambda: shamir.split(secret), repeat)
+            evaluation = timeit(lambda: Shamir.fPolyMany(xs, poly, prime), repeat)
+            legacy = timeit(lambda: [legacyFPoly(x, poly, prime) for x in xs], repeat)
+            print("%6d %4d %6d %12.3f %12.3f %12.3f"
+                  % (width, k, n, split * 1000, evaluation * 1000, legacy * 1000))
+
+
+def benchInv(repeat, count=200):
+    print("modular inverse, %d values (best of %d)" % (count, repeat))
+    print("%6s %14s %14s" % ("width", "pow (us)", "bezout (us)"))
+    for (width, prime) in widthSets:
+        values = [(prime // (i + 2)) | 1 for i in range(count)]
+        builtin = timeit(lambda: [Shamir.inv(v, prime) for v in values], repeat)
+        bezout = timeit(lambda: [Shamir.bezout(v, prime)[0] % prime for v in values], repeat)
+        print("%6d %14.2f %14.2f" % (width, builtin / count * 1e6, bezout / count * 1e6))
+
+
+def benchLargeN(repeat):
+    print("large n, 256-bit secret (best of %d)" % repeat)
+    print("%6s %5s %6s %14s %12s %12s" % ("n", "k", "x bits", "x draw (ms)", "split (ms)", "combine (ms)"))
+    secret = 0x522a6ff25f78f3be3aa804f0f1d21a25e0bb98c26001b9082bb5e42a9e1f25ac
+    for (n, k) in [(1000, 10), (1000, 100), (65000, 10), (65000, 100)]:
+        for xBits in [16, 32]:
+            shamir = Shamir(k=k, n=n, width=256, xBits=xBits)
+            draw = timeit(lambda: shamir.drawX(Prng(deterministic=True)), repeat)
+            shares = shamir.split(secret)
+            split = timeit(lambda: shamir.split(secret), repeat)
+            Shamir.lagrange.cache_clear()
+            combine = timeit(lambda: (Shamir.lagrange.cache_clear(), shamir.combine(shares[-k:])), repeat)
+            print("%6d %5d %6d %14.1f %12.1f %12.1f" % (n, k, xBits, draw * 1000, split * 1000, combine * 1000))
+
+
+if __name__ == "__main__":
+
+    parser = optparse.OptionParser()
+
+    parser.add_option("-r", "--repeat",
+                      action="store", dest="repeat", default=3, type="int",
+                      help="Number of runs, the best one is reported")
+
+    (options, args) = parser.parse_args()
+
+    benchSplit(options.repeat)
+    print()
+    benchInv(options.repeat)
+    print()
+    benchLargeN(options.repeat)
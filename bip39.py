@@ -4,10 +4,21 @@ import hashlib
 import binascii
 import optparse
 import getpass
+import os
+import unicodedata
+import multiprocessing
+import wordlist
+from utils import rawFromLong
 
 version = "v0.5.0"
 
 words = {}
+indexes = {}
+crossIndex = None
+fuzzyIndexes = {}
+
+# largest edit distance served by the fuzzy index
+fuzzyMaxDistance = 2
 
 languages = \
     [
@@ -16,131 +27,281 @@ languages = \
     ]
 
 
+# one plain text resource per language, only read (and compiled) on first use
+for language in languages:
+    wordlist.registerTextWordList("bip39-" + language, os.path.join("wordlists", "bip39-%s.txt" % language))
+
+
 class BIP39Dict(object):
     def __init__(self, lang="english"):
         self.words = loadWords(lang)
-        pass
+        (self.wordIndex, self.prefixIndex) = loadIndex(lang)
 
     def has(self, word):
-        try:
-            self.indexOf(word)
-            return True
-        except ValueError:
-            return False
+        return self.find(word) is not None
+
+    def find(self, word):
+        """ Same as indexOf, but returns None for unknown words """
+        index = self.wordIndex.get(word)
+        if index is not None or len(word) < 4:
+            return index
+        # BIP39 words are unique on their first 4 letters: at most one candidate
+        index = self.prefixIndex.get(word[:4])
+        if index is not None and self.words[index].startswith(word):
+            return index
+        return None
 
     def indexOf(self, word):
-        try:
-            return self.words.index(word)
-        except ValueError:
-            pass
-        if len(word) < 4:
+        index = self.find(word)
+        if index is None:
             raise ValueError("word not found: {}".format(word))
-        index = 0
-        for item in self.words:
-            if item.startswith(word):
-                return index
-            index += 1
-        raise ValueError("word not found: {}".format(word))
+        return index
 
     def wordAt(self, index):
         return self.words[index]
 
 
+def loadIndex(lang="english"):
+    """ word -> index and 4-letter prefix -> index maps, built once per language """
+    global indexes
+    if lang not in indexes:
+        wordIndex = {}
+        prefixIndex = {}
+        for (index, word) in enumerate(loadWords(lang)):
+            wordIndex.setdefault(word, index)
+            prefixIndex.setdefault(word[:4], index)
+        indexes[lang] = (wordIndex, prefixIndex)
+    return indexes[lang]
+
+
+def normalizeWord(word):
+    """ Lower case without accents, so that "zenith" matches "zénith" """
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def deletions(word, distance):
+    """ Every string obtained by deleting up to distance characters from word """
+    result = {word}
+    current = {word}
+    for _ in range(distance):
+        current = {item[:i] + item[i + 1:] for item in current for i in range(len(item))}
+        result |= current
+    return result
+
+
+def editDistance(a, b):
+    """ Optimal string alignment distance (insertions, deletions, substitutions, transpositions) """
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        (previous2, previous) = (previous, current)
+    return previous[len(b)]
+
+
+def loadFuzzyIndex(lang="english"):
+    """
+    Deletion neighbourhood map: every string reachable by deleting up to fuzzyMaxDistance
+    characters from a normalized word or from its 4-letter abbreviation -> word indices.
+    """
+    global fuzzyIndexes
+    if lang not in fuzzyIndexes:
+        index = {}
+        for (position, word) in enumerate(loadWords(lang)):
+            normalized = normalizeWord(word)
+            for key in deletions(normalized, fuzzyMaxDistance) | deletions(normalized[:4], fuzzyMaxDistance):
+                index.setdefault(key, set()).add(position)
+        fuzzyIndexes[lang] = index
+    return fuzzyIndexes[lang]
+
+
+def suggestWords(word, lang=None, maxDistance=fuzzyMaxDistance, limit=5):
+    """
+    Words close to a misspelt one, closest first. The distance is taken to the word or to its
+    4-letter abbreviation, whichever is smaller. lang=None searches every language.
+    """
+    if maxDistance > fuzzyMaxDistance:
+        raise ValueError("max distance should be at most %d" % fuzzyMaxDistance)
+    normalized = normalizeWord(word)
+    keys = deletions(normalized, maxDistance)
+    ranked = []
+    for language in ([lang] if lang else languages):
+        index = loadFuzzyIndex(language)
+        wordList = loadWords(language)
+        candidates = set()
+        for key in keys:
+            candidates |= index.get(key, set())
+        for position in candidates:
+            target = normalizeWord(wordList[position])
+            distance = min(editDistance(normalized, target), editDistance(normalized, target[:4]))
+            if distance <= maxDistance:
+                ranked.append((distance, languages.index(language), position, wordList[position]))
+    ranked.sort()
+    result = []
+    for (_, _, _, suggestion) in ranked:
+        if suggestion not in result:
+            result.append(suggestion)
+    return result[:limit]
+
+
 def loadWords(lang="english"):
     global words
     for language in languages:
         if lang == language:
             if lang not in words:
-                from bip39words import bip39Words
-                words[lang] = bip39Words[lang].split("\n")
+                words[lang] = wordlist.getWordList("bip39-" + lang)
             return words[lang]
     raise ValueError("unknown BIP39 language: %s".format(language))
 
 
-def detectLang(mnemonic):
+def loadCrossIndex():
+    """ word -> {language: index} and 4-letter prefix -> {language: index} maps over all languages """
+    global crossIndex
+    if crossIndex is None:
+        wordMap = {}
+        prefixMap = {}
+        for language in languages:
+            (wordIndex, prefixIndex) = loadIndex(language)
+            for (word, index) in wordIndex.items():
+                wordMap.setdefault(word, {})[language] = index
+            for (prefix, index) in prefixIndex.items():
+                prefixMap.setdefault(prefix, {})[language] = index
+        crossIndex = (wordMap, prefixMap)
+    return crossIndex
+
+
+def lookupWord(word):
+    """ Returns {language: index} for every language where word (or its abbreviation) is found """
+    (wordMap, prefixMap) = loadCrossIndex()
+    result = dict(wordMap.get(word, {}))
+    if len(word) >= 4:
+        for (language, index) in prefixMap.get(word[:4], {}).items():
+            if language not in result and loadWords(language)[index].startswith(word):
+                result[language] = index
+    return result
+
+
+def decodeMnemonic(mnemonic):
+    """ Detects the language of a mnemonic and returns it with the word indices, in one pass """
+    candidates = {language: [] for language in languages}
+    for word in mnemonic:
+        found = lookupWord(word)
+        if not found:
+            suggestions = suggestWords(word)
+            hint = " (did you mean: %s?)" % ", ".join(suggestions) if suggestions else ""
+            raise ValueError("%s is not a valid BIP39 mnemonic word%s" % (word, hint))
+        for language in list(candidates):
+            if language in found:
+                candidates[language].append(found[language])
+            else:
+                del candidates[language]
+        if not candidates:
+            break
     for language in languages:
-        dic = BIP39Dict(language)
-        error = False
-        for word in mnemonic:
-            if not dic.has(word):
-                error = True
-                break
-        if not error:
-            # print("lang = " + language)
-            return language
+        if language in candidates:
+            return language, candidates[language]
     raise ValueError("could not detect language for given mnemonic")
 
 
-def rawFromBIP39(mnemonic):
-    words = BIP39Dict(detectLang(mnemonic))
-    buffer = 0
-    result = b""
-    mnemonicLen = len(mnemonic)
+def detectLang(mnemonic):
+    return decodeMnemonic(mnemonic)[0]
+
+
+def checksumBits(raw, checksumLen):
+    if checksumLen > 256:
+        raise ValueError("seed too long for a BIP39 checksum (%d bits)" % (len(raw) * 8))
+    return int.from_bytes(hashlib.sha256(raw).digest(), byteorder="big") >> (256 - checksumLen)
+
+
+def indicesFromRaw(rawSeed):
+    """ Splits seed + checksum, taken as one integer, into 11-bit word indices """
+    seedLen = len(rawSeed) * 8
+    checksumLen = seedLen // 32
+    totalLen = seedLen + checksumLen
+    wordCount = totalLen // 11
+    value = (int.from_bytes(rawSeed, byteorder="big") << checksumLen) | checksumBits(rawSeed, checksumLen)
+    value >>= totalLen - wordCount * 11
+    return [(value >> (11 * i)) & 0x7FF for i in range(wordCount - 1, -1, -1)]
+
+
+def rawFromIndices(indices):
+    """ Rebuilds the seed from 11-bit word indices and checks its checksum """
+    mnemonicLen = len(indices)
     if mnemonicLen % 3 != 0:
-        raise ValueError("mnemonic size should be a multiple of 3 (%d)" % len(mnemonic))
-    for word in mnemonic:
-        if not words.has(word):
-            raise ValueError("%s is not a valid BIP39 mnemonic word" % word)
-        buffer = (buffer << 11) | words.indexOf(word)
+        raise ValueError("mnemonic size should be a multiple of 3 (%d)" % mnemonicLen)
+    buffer = 0
+    for index in indices:
+        buffer = (buffer << 11) | index
     checksumLen = mnemonicLen // 3
-    readChecksum = buffer & ((1 << checksumLen) - 1)
     payloadLen = mnemonicLen * 11 - checksumLen
-    payload = buffer >> checksumLen
-    # print "buffer: %x" % buffer
-    for i in range(payloadLen // 8):
-        result += bytes([payload & 0xFF])
-        payload >>= 8
-    result = result[::-1]
-    m = hashlib.sha256()
-    m.update(result)
-    verRawChecksum = m.digest()
-    verChecksum = 0
-    verChecksumLen = 0
-    for i in range((checksumLen - 1) // 8 + 1):
-        verChecksum = (verChecksum << 8) | verRawChecksum[i]
-        verChecksumLen += 8
-    verChecksum >>= verChecksumLen - checksumLen
-    if readChecksum != verChecksum:
+    result = (buffer >> checksumLen).to_bytes(payloadLen // 8, byteorder="big")
+    if buffer & ((1 << checksumLen) - 1) != checksumBits(result, checksumLen):
         raise ValueError("bad checksum")
     return result
 
 
+def rawFromBIP39(mnemonic):
+    (_, indices) = decodeMnemonic(mnemonic)
+    if len(mnemonic) % 3 != 0:
+        raise ValueError("mnemonic size should be a multiple of 3 (%d)" % len(mnemonic))
+    return rawFromIndices(indices)
+
+
+def decode_many(mnemonics):
+    return [rawFromBIP39(mnemonic) for mnemonic in mnemonics]
+
+
 def longFromBIP39(mnemonic):
-    buffer = 0
-    for char in rawFromBIP39(mnemonic):
-        buffer = (buffer << 8) | ord(char)
-    return buffer
+    return int.from_bytes(rawFromBIP39(mnemonic), byteorder="big")
 
 
 def hexFromBIP39(mnemonic):
-    result = ""
-    for char in rawFromBIP39(mnemonic):
-        result += "%02x" % char
-    return result
+    return rawFromBIP39(mnemonic).hex()
 
 
 def BIP39FromRaw(rawSeed, lang="english"):
-    words = BIP39Dict(lang)
-    seedLen = len(rawSeed) * 8
-    m = hashlib.sha256()
-    m.update(rawSeed)
-    checksum = m.digest()
-    entropy = rawSeed + checksum
-    bip39SeedLen = (seedLen + seedLen // 32) // 11
-    currentLen = 0
-    value = 0
-    wordList = []
-    for byte in entropy:
-        currentLen += 8
-        value = (value << 8) | byte
-        if currentLen >= 11:
-            wordIndex = (value >> (currentLen - 11))
-            value &= (1 << (currentLen - 11)) - 1
-            currentLen -= 11
-            # print "wordIndex: %d" % wordIndex
-            wordList += [words.wordAt(wordIndex)]
-            if len(wordList) == bip39SeedLen:
-                return wordList
+    words = loadWords(lang)
+    return [words[index] for index in indicesFromRaw(rawSeed)]
+
+
+def encode_many(rawSeeds, lang="english"):
+    words = loadWords(lang)
+    return [[words[index] for index in indicesFromRaw(rawSeed)] for rawSeed in rawSeeds]
+
+
+def seedFromMnemonic(mnemonic, passphrase=""):
+    """
+    512-bit BIP39 seed: PBKDF2-HMAC-SHA512, 2048 rounds, salt "mnemonic" + passphrase.
+    mnemonic is a list of words or a sentence, used as given (abbreviations are not expanded).
+    """
+    if not isinstance(mnemonic, str):
+        mnemonic = " ".join(mnemonic)
+    password = unicodedata.normalize("NFKD", mnemonic).encode("utf-8")
+    salt = unicodedata.normalize("NFKD", "mnemonic" + passphrase).encode("utf-8")
+    return hashlib.pbkdf2_hmac("sha512", password, salt, 2048)
+
+
+def seedFromPair(pair):
+    return seedFromMnemonic(*pair)
+
+
+def seedsFromMnemonics(pairs, processes=None):
+    """
+    Derives the seeds of a list of (mnemonic, passphrase) pairs, spread over a process pool.
+    processes=1 derives them in the calling process.
+    """
+    pairs = list(pairs)
+    if processes is None:
+        processes = min(len(pairs), os.cpu_count() or 1)
+    if processes <= 1:
+        return [seedFromPair(pair) for pair in pairs]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(seedFromPair, pairs, chunksize=max(1, len(pairs) // (processes * 4)))
 
 
 def BIP39FromHex(hexSeed, lang="english"):
@@ -148,12 +309,7 @@ def BIP39FromHex(hexSeed, lang="english"):
 
 
 def BIP39FromLong(longValue, width=256, lang="english"):
-    raw = []
-    buffer = longValue
-    for i in range(width // 8):
-        raw += bytes([buffer & 0xFF])
-        buffer >>= 8
-    return BIP39FromRaw(bytes(raw[::-1]), lang)
+    return BIP39FromRaw(rawFromLong(longValue, width), lang)
 
 
 if __name__ == "__main__":
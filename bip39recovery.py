@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import hashlib
+import itertools
+import multiprocessing
+import optparse
+import getpass
+import bip39
+
+version = "v0.1.0"
+
+unknownWord = "?"
+
+
+def recoveryOptions(mnemonic, lang, candidates=None, fuzzy=False):
+    """
+    Candidate word indices for every position of the mnemonic: the word itself when it is known,
+    the given candidates for the position if any, every word otherwise (missing or garbled word).
+    With fuzzy, a garbled word is replaced by its spelling suggestions instead of every word.
+    """
+    words = bip39.BIP39Dict(lang)
+    candidates = candidates or {}
+    options = []
+    for (position, word) in enumerate(mnemonic):
+        if position in candidates:
+            indices = [words.find(candidate) for candidate in candidates[position]]
+            options.append(sorted(set(index for index in indices if index is not None)))
+            continue
+        index = None if word in (None, unknownWord) else words.find(word)
+        if index is not None:
+            options.append([index])
+        elif fuzzy and word not in (None, unknownWord):
+            suggestions = bip39.suggestWords(word, lang, limit=None)
+            options.append(sorted(words.indexOf(suggestion) for suggestion in suggestions))
+        else:
+            options.append(list(range(2048)))
+    return options
+
+
+def searchIndices(options):
+    """
+    Generator over the index lists allowed by options that carry a valid checksum.
+    When the last word is not fixed, the checksum gives its low bits directly, so only its
+    high bits are enumerated.
+    """
+    mnemonicLen = len(options)
+    if mnemonicLen % 3 != 0:
+        raise ValueError("mnemonic size should be a multiple of 3 (%d)" % mnemonicLen)
+    checksumLen = mnemonicLen // 3
+    nBytes = (mnemonicLen * 11 - checksumLen) // 8
+    lastBits = 11 - checksumLen
+
+    base = 0
+    variables = []
+    for (position, indices) in enumerate(options[:-1]):
+        shift = 11 * (mnemonicLen - 2 - position)
+        if len(indices) == 1:
+            base |= indices[0] << shift
+        else:
+            variables.append((position, [index << shift for index in indices]))
+
+    lastOptions = set(options[-1])
+    lastHighs = sorted(set(index >> checksumLen for index in lastOptions))
+
+    if checksumLen > 32:
+        raise ValueError("mnemonic too long: %d words" % mnemonicLen)
+    checksumShift = 32 - checksumLen
+    sha256 = hashlib.sha256
+    fromBytes = int.from_bytes
+
+    for values in itertools.product(*[shifted for (_, shifted) in variables]):
+        prefix = (base | sum(values)) << lastBits
+        for high in lastHighs:
+            digest = sha256((prefix | high).to_bytes(nBytes, "big")).digest()
+            last = (high << checksumLen) | (fromBytes(digest[:4], "big") >> checksumShift)
+            if last in lastOptions:
+                result = [indices[0] for indices in options[:-1]] + [last]
+                for ((position, _), value) in zip(variables, values):
+                    result[position] = value >> (11 * (mnemonicLen - 2 - position))
+                yield result
+
+
+def searchIndicesList(options):
+    """ searchIndices as a list, for the process pool workers """
+    return list(searchIndices(options))
+
+
+def detectLang(mnemonic):
+    """
+    Language matching the most words of a damaged mnemonic: missing words and words found in no
+    language are ignored, ties go to the first language.
+    """
+    counts = dict.fromkeys(bip39.languages, 0)
+    for word in mnemonic:
+        if word not in (None, unknownWord):
+            for language in bip39.lookupWord(word):
+                counts[language] += 1
+    return max(bip39.languages, key=lambda language: counts[language])
+
+
+def recoverMnemonic(mnemonic, lang=None, candidates=None, processes=1, fuzzy=False):
+    """
+    Generator over every mnemonic with a valid checksum matching the given one.
+    mnemonic is a list of words where None or "?" marks a missing word, unknown words are treated
+    as missing, or replaced by their spelling suggestions with fuzzy.
+    candidates optionally maps a position to the list of words allowed there.
+    With processes > 1 the search space is split over a process pool.
+    """
+    if lang is None:
+        lang = detectLang(mnemonic)
+    words = bip39.loadWords(lang)
+    options = recoveryOptions(mnemonic, lang, candidates, fuzzy)
+
+    free = [position for (position, indices) in enumerate(options[:-1]) if len(indices) > 1]
+    if processes <= 1 or not free:
+        for indices in searchIndices(options):
+            yield [words[index] for index in indices]
+        return
+
+    # one task per word of the first free position (but the last one), so that results
+    # come back as soon as each small task is done
+    position = free[0]
+    chunks = [options[:position] + [[index]] + options[position + 1:] for index in options[position]]
+    with multiprocessing.Pool(processes) as pool:
+        for found in pool.imap(searchIndicesList, chunks):
+            for indices in found:
+                yield [words[index] for index in indices]
+
+
+if __name__ == "__main__":
+
+    parser = optparse.OptionParser()
+
+    parser.add_option("-l", "--lang",
+                      action="store", dest="lang", default=None, type="str",
+                      help="Language used for BIP39 mnemonic (detected if omitted)")
+
+    parser.add_option("-p", "--processes",
+                      action="store", dest="processes", default=multiprocessing.cpu_count(), type="int",
+                      help="Number of worker processes")
+
+    parser.add_option("-f", "--fuzzy",
+                      action="store_true", dest="fuzzy", default=False,
+                      help="Only try spelling suggestions for misspelt words")
+
+    (options, args) = parser.parse_args()
+
+    data = getpass.getpass("BIP39 mnemonic (? for missing words):")
+
+    count = 0
+    for candidate in recoverMnemonic(data.split(), options.lang, processes=options.processes,
+                                     fuzzy=options.fuzzy):
+        print(" ".join(candidate))
+        count += 1
+    print("%d candidate(s)" % count)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+#
+# Shamir secret sharing over GF(2^8), one polynomial per byte of the secret.
+# All bytes are processed at once: with NumPy through the log/exp tables, otherwise with
+# bytes.translate on precomputed multiplication tables and big-integer XOR.
+#
+from prng import Prng
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+version = "v0.1.0"
+
+# AES polynomial x^8 + x^4 + x^3 + x + 1, generator 3
+POLYNOMIAL = 0x11B
+GENERATOR = 3
+
+
+def buildTables():
+    exp = [0] * 510
+    log = [0] * 256
+    value = 1
+    for i in range(255):
+        exp[i] = value
+        log[value] = i
+        # value *= GENERATOR (3 = x + 1): value * x + value
+        doubled = value << 1
+        if doubled & 0x100:
+            doubled ^= POLYNOMIAL
+        value = doubled ^ value
+    for i in range(255, 510):
+        exp[i] = exp[i - 255]
+    return exp, log
+
+
+expTable, logTable = buildTables()
+
+
+def mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return expTable[logTable[a] + logTable[b]]
+
+
+def div(a, b):
+    if b == 0:
+        raise ZeroDivisionError("division by zero in GF(256)")
+    if a == 0:
+        return 0
+    return expTable[logTable[a] + 255 - logTable[b]]
+
+
+# mulTables[c] maps every byte b to c * b, to be used with bytes.translate; rows are built on first use
+mulTables = {}
+
+
+def mulTable(c):
+    table = mulTables.get(c)
+    if table is None:
+        table = mulTables[c] = bytes(mul(c, b) for b in range(256))
+    return table
+
+if numpy is not None:
+    numpyExp = numpy.array(expTable, dtype=numpy.uint8)
+    numpyLog = numpy.array(logTable, dtype=numpy.int32)
+
+
+def xorBytes(a, b):
+    return (int.from_bytes(a, byteorder="big") ^ int.from_bytes(b, byteorder="big")).to_bytes(len(a), byteorder="big")
+
+
+def scaleBytes(data, c):
+    """ c * every byte of data """
+    if numpy is not None:
+        values = numpy.frombuffer(data, dtype=numpy.uint8)
+        if c == 0:
+            return bytes(len(data))
+        products = numpyExp[numpyLog[values] + logTable[c]]
+        return numpy.where(values == 0, 0, products).astype(numpy.uint8).tobytes()
+    return data.translate(mulTable(c))
+
+
+def solve(rows):
+    """
+    One solution of the linear system given as augmented rows (bytes) [a_0 .. a_m-1 | b],
+    free variables set to 0. Returns None if the system is inconsistent.
+    Row operations are done on whole rows with bytes.translate and XOR.
+    """
+    rows = [bytes(row) for row in rows]
+    unknowns = len(rows[0]) - 1
+    pivots = []
+    r = 0
+    for c in range(unknowns):
+        pivot = next((i for i in range(r, len(rows)) if rows[i][c]), None)
+        if pivot is None:
+            continue
+        (rows[r], rows[pivot]) = (rows[pivot], rows[r])
+        rows[r] = rows[r].translate(mulTable(div(1, rows[r][c])))
+        for i in range(len(rows)):
+            if i != r and rows[i][c]:
+                rows[i] = xorBytes(rows[i], rows[r].translate(mulTable(rows[i][c])))
+        pivots.append(c)
+        r += 1
+        if r == len(rows):
+            break
+    if any(row[-1] for row in rows[r:]):
+        return None
+    solution = [0] * unknowns
+    for (i, c) in enumerate(pivots):
+        solution[c] = rows[i][-1]
+    return solution
+
+
+def polyDivMod(num, den):
+    """ (quotient, remainder) of polynomials given as coefficient lists, lowest degree first, den monic """
+    num = list(num)
+    quotient = [0] * max(1, len(num) - len(den) + 1)
+    for i in range(len(num) - len(den), -1, -1):
+        q = num[i + len(den) - 1]
+        quotient[i] = q
+        for j in range(len(den)):
+            num[i + j] ^= mul(q, den[j])
+    return quotient, num[:len(den) - 1]
+
+
+def fPoly(x, poly):
+    result = 0
+    for coefficient in reversed(poly):
+        result = mul(result, x) ^ coefficient
+    return result
+
+
+class ShamirGF256:
+
+    def __init__(self, k, n):
+        if not 1 <= k <= 255:
+            raise ValueError("k must be between 1 and 255: %d" % k)
+        if n > 255:
+            raise ValueError("n must be at most 255 in GF(256): %d" % n)
+        self.k = k
+        self.n = n
+
+    @staticmethod
+    def fPolyBytes(x, poly):
+        """ Horner's rule on every byte at once, poly holds one coefficient string per degree """
+        result = poly[-1]
+        for coefficient in reversed(poly[:-1]):
+            result = xorBytes(scaleBytes(result, x), coefficient)
+        return result
+
+    @staticmethod
+    def lagrange(xs):
+        """ Lagrange coefficients at 0 for the x coordinates xs """
+        if len(set(xs)) != len(xs) or 0 in xs:
+            raise ValueError("x coordinates must be distinct and non zero")
+        result = []
+        for i in range(len(xs)):
+            num = 1
+            den = 1
+            for j in range(len(xs)):
+                if i != j:
+                    num = mul(num, xs[j])
+                    den = mul(den, xs[j] ^ xs[i])
+            result.append(div(num, den))
+        return result
+
+    def split(self, secret, deterministic=True):
+        """ secret is a bytes object, returns n (x, y) shares where y has the length of secret """
+        prng = Prng(deterministic=deterministic)
+        prng.add_entropy(secret)
+
+        poly = [bytes(secret)] + [prng.random_bytes(len(secret)) for _ in range(1, self.k)]
+
+        x = []
+        for i in range(self.n):
+            while True:
+                r = prng.getRandomLong(8)
+                if r != 0 and r not in x:
+                    x += [r]
+                    break
+
+        return [(xi, ShamirGF256.fPolyBytes(xi, poly)) for xi in x]
+
+    def combine_robust(self, shares):
+        """
+        Reconstructs the secret from all the given shares, tolerating corrupted ones: every byte is
+        decoded on its own (Berlekamp-Welch), correcting up to (len(shares) - k) // 2 bad values.
+        Returns (secret, indices of the shares that are wrong in at least one byte).
+        """
+        m = len(shares)
+        if m < self.k:
+            raise ValueError("need at least %d shares, got %d" % (self.k, m))
+        xs = [x for (x, _) in shares]
+        if len(set(xs)) != m or 0 in xs:
+            raise ValueError("x coordinates must be distinct and non zero")
+        e = (m - self.k) // 2
+        powers = []
+        for x in xs:
+            row = [1]
+            for _ in range(self.k + e):
+                row.append(mul(row[-1], x))
+            powers.append(row)
+        # Q(x_i) + y_i * (E(x_i) - x_i^e) = y_i * x_i^e, E monic of degree e (subtraction is XOR)
+        secret = bytearray()
+        bad = set()
+        for position in range(len(shares[0][1])):
+            ys = [y[position] for (_, y) in shares]
+            rows = [bytes(row[:self.k + e] + [mul(y, p) for p in row[:e]] + [mul(y, row[e])])
+                    for (row, y) in zip(powers, ys)]
+            solution = solve(rows)
+            if solution is None:
+                raise ValueError("too many corrupted shares")
+            (poly, remainder) = polyDivMod(solution[:self.k + e], solution[self.k + e:] + [1])
+            if any(remainder) or any(poly[self.k:]):
+                raise ValueError("too many corrupted shares")
+            errors = [i for (i, (x, y)) in enumerate(zip(xs, ys)) if fPoly(x, poly[:self.k]) != y]
+            if len(errors) > e:
+                raise ValueError("too many corrupted shares")
+            bad.update(errors)
+            secret.append(poly[0])
+        return bytes(secret), sorted(bad)
+
+    def combine(self, shares):
+        if len(shares) < self.k:
+            raise ValueError("need %d shares, got %d" % (self.k, len(shares)))
+        shares = shares[:self.k]
+        coefficients = ShamirGF256.lagrange([x for (x, _) in shares])
+        secret = bytes(len(shares[0][1]))
+        for ((_, y), c) in zip(shares, coefficients):
+            secret = xorBytes(secret, scaleBytes(y, c))
+        return secret
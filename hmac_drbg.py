@@ -2,9 +2,8 @@
 
 import hashlib
 import hmac
-from io import BytesIO
 
-version = "v1.0.0"
+version = "v1.1.0"
 
 
 class HmacDrbg:
@@ -16,12 +15,30 @@ class HmacDrbg:
     """
 
     def __init__(self, seed=b""):
+        self._template = None
         self.key = b'\x00' * 64
         self.val = b'\x01' * 64
         self.add_entropy(seed)
 
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        # the keyed HMAC state only changes with the key: drop the cached one
+        self._key = key
+        self._template = None
+
+    def hmac_template(self):
+        if self._template is None:
+            self._template = hmac.new(self._key, digestmod=hashlib.sha512)
+        return self._template
+
     def hmac(self, val):
-        return hmac.new(self.key, val, hashlib.sha512).digest()
+        h = self.hmac_template().copy()
+        h.update(val)
+        return h.digest()
 
     def add_entropy(self, data=b""):
         self.key = self.hmac(self.val + b'\x00' + data)
@@ -30,15 +47,38 @@ class HmacDrbg:
             self.key = self.hmac(self.val + b'\x01' + data)
             self.val = self.hmac(self.val)
 
-    def random_bytes(self, length):
-        stream = BytesIO()
-        streamlen = 0
-        while streamlen < length:
-            self.val = self.hmac(self.val)
-            stream.write(self.val)
-            streamlen += len(self.val)
-        return stream.getvalue()[:length]
+    def advance(self, n_blocks):
+        """ Fast-forward the generator by n_blocks output blocks without producing them """
+        val = self.val
+        template = self.hmac_template()
+        for _ in range(n_blocks):
+            h = template.copy()
+            h.update(val)
+            val = h.digest()
+        self.val = val
+
+    def random_bytes_into(self, buffer):
+        """ Fill buffer (bytearray, memoryview, mmap...) with output, returns the number of bytes written """
+        out = memoryview(buffer).cast("B")
+        length = len(out)
+        template = self.hmac_template()
+        blockSize = template.digest_size
+        val = self.val
+        offset = 0
+        while offset < length:
+            h = template.copy()
+            h.update(val)
+            val = h.digest()
+            end = min(offset + blockSize, length)
+            out[offset:end] = val[:end - offset]
+            offset = end
+        self.val = val
+        return length
 
+    def random_bytes(self, length):
+        buffer = bytearray(length)
+        self.random_bytes_into(buffer)
+        return bytes(buffer)
 
 # if __name__ == "__main__":
 #     prng = HmacDrbg()
@@ -7,13 +7,14 @@ import getpass
 import binascii
 import time
 import os
+import sys
 import random
 from io import BytesIO
 import bip39
 import optparse
 
-import bip39words
 from hmac_drbg import HmacDrbg
+import wordlist
 
 version = "v3.1.0"
 
@@ -22,6 +23,15 @@ pwcharset = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
 unique_id_charset = "abcdefghijklmnopqrstuvwxyz"
 pwdigitset = "0123456789"
 
+wordlist.registerTextWordList("french", "mots_francais.txt")
+
+# get_random_integer sampling engines
+# v1: byte-granular rejection sampling, one DRBG request per sample (legacy stream)
+# v2: bit-granular rejection sampling fed by a per-Prng bit reservoir
+samplingV1 = 1
+samplingV2 = 2
+samplingVersions = [samplingV1, samplingV2]
+
 class Prng:
     """
     if deterministic, HMAC_DRBG (SHA-512) as specified in NIST SP 800-90A.
@@ -30,10 +40,15 @@ class Prng:
     https://www.schneier.com/blog/archives/2017/08/proof_that_hmac.html
     """
 
-    def __init__(self, deterministic=False, seed=b""):
+    def __init__(self, deterministic=False, seed=b"", samplingVersion=samplingV1):
+        if samplingVersion not in samplingVersions:
+            raise ValueError("unknown sampling version: %d" % samplingVersion)
         self.deterministic = deterministic
+        self.samplingVersion = samplingVersion
         self.round = 0
         self.timestampRef = 0
+        self.bitPool = 0
+        self.bitPoolLen = 0
         self.impl = HmacDrbg(seed=seed)
         if not self.deterministic:
             self.addExternalEntropy()
@@ -49,12 +64,47 @@ class Prng:
         self.add_entropy(("%d" % os.getppid()).encode("utf-8"))
 
     def skip(self, nBytes):
-        self.random_bytes(nBytes)
+        self.round += 1
+        blockSize = hashlib.sha512().digest_size
+        self.impl.advance((nBytes + blockSize - 1) // blockSize)
 
     def add_entropy(self, entropy):
+        # bits drawn before the new entropy must not be served after it
+        self.bitPool = 0
+        self.bitPoolLen = 0
         self.impl.add_entropy(entropy)
 
     def get_random_integer(self, max_value):
+        if self.samplingVersion == samplingV2:
+            return self.get_random_integers(max_value, 1)[0]
+        return self._get_random_integer_v1(max_value)
+
+    def get_random_integers(self, max_value, count):
+        if self.samplingVersion == samplingV1:
+            return [self._get_random_integer_v1(max_value) for _ in range(count)]
+        if max_value < 1:
+            raise ValueError("max value should be at least 1: %d" % max_value)
+        nbits = (max_value - 1).bit_length()
+        result = []
+        while len(result) < count:
+            value = self.getRandomBits(nbits)
+            if value < max_value:
+                result.append(value)
+        return result
+
+    def getRandomBits(self, nBits):
+        """ Returns an nBits integer taken from the bit reservoir, refilled one DRBG block at a time """
+        while self.bitPoolLen < nBits:
+            block = self.impl.random_bytes(hashlib.sha512().digest_size)
+            self.round += 1
+            self.bitPool |= int.from_bytes(block, byteorder="big") << self.bitPoolLen
+            self.bitPoolLen += len(block) * 8
+        value = self.bitPool & ((1 << nBits) - 1)
+        self.bitPool >>= nBits
+        self.bitPoolLen -= nBits
+        return value
+
+    def _get_random_integer_v1(self, max_value):
         pow2 = 1
         nbits = 0
         while pow2 < max_value:
@@ -66,27 +116,52 @@ class Prng:
                 return value
 
     def getRandomLong(self, nBits):
+        return self.getRandomLongs(nBits, 1)[0]
+
+    def getRandomLongs(self, nBits, count):
+        """
+        Draws count integers of nBits each in a single DRBG request.
+        Every value starts on a fresh output block, so the result is the same as
+        count successive calls to getRandomLong(nBits).
+        """
         if nBits % 8 != 0:
             raise ValueError("argument should be a multiple of 8: %d" % nBits)
         nBytes = nBits // 8
-        rnTable = self.random_bytes(nBytes)
-        result = 0
-        if nBytes >= 1:
-            for i in range(nBytes):
-                result = (result << 8) + rnTable[i]
-        return result
+        blockSize = hashlib.sha512().digest_size
+        stride = (nBytes + blockSize - 1) // blockSize * blockSize
+        self.round += count
+        if nBytes == 0:
+            return [0] * count
+        rnTable = self.impl.random_bytes(stride * count)
+        return [int.from_bytes(rnTable[i:i + nBytes], byteorder="big") for i in range(0, stride * count, stride)]
 
     def random_bytes(self, size):
         self.round += 1
         return self.impl.random_bytes(size)
 
+    def random_bytes_into(self, buffer):
+        self.round += 1
+        return self.impl.random_bytes_into(buffer)
+
+    def write_stream(self, fileobj, nbytes, chunk_size=1024 * 1024):
+        """ Write nbytes of output to fileobj, holding at most one chunk in memory """
+        blockSize = hashlib.sha512().digest_size
+        if chunk_size <= 0 or chunk_size % blockSize != 0:
+            raise ValueError("chunk size should be a positive multiple of %d: %d" % (blockSize, chunk_size))
+        self.round += 1
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        written = 0
+        while written < nbytes:
+            size = min(chunk_size, nbytes - written)
+            self.impl.random_bytes_into(view[:size])
+            fileobj.write(view[:size])
+            written += size
+        return written
+
 
 def bytes2long(_bytes):
-    result = 0
-    for byte in _bytes:
-        result <<= 8
-        result |= byte
-    return result
+    return int.from_bytes(_bytes, byteorder="big")
 
 
 def split_value(value, item_count, item_range):
@@ -115,7 +190,7 @@ def long2str(value, charset, length):
 
 
 def get_words_password(value, nwords=4, uppercase=False, sep=' ', digits=False):
-    dico = open("mots_francais.txt").read().split("\n")
+    dico = wordlist.getWordList("french")
     (arr, entropy) = split_value(value, nwords, len(dico))
     result = []
     count = 1
@@ -187,10 +262,27 @@ if __name__ == "__main__":
                       action="store", dest="lang", default="english", type="str",
                       help="Language used for BIP39 mnemonic")
 
+    parser.add_option("-o", "--output",
+                      action="store", dest="output", default=None, type="str",
+                      help="Write random data to this file instead of the interactive mode")
+
+    parser.add_option("-s", "--size",
+                      action="store", dest="size", default=256 * 1024 * 1024, type="int",
+                      help="Number of bytes written with --output (default: 256 MiB)")
+
     (options, args) = parser.parse_args()
 
     prng = Prng()
 
+    if options.output:
+        start = time.time()
+        with open(options.output, "wb") as f:
+            written = prng.write_stream(f, options.size)
+        elapsed = max(time.time() - start, 1e-9)
+        print("%d bytes written to %s in %.2f s (%.1f MiB/s)"
+              % (written, options.output, elapsed, written / elapsed / (1024 * 1024)))
+        sys.exit(0)
+
     while True:
         from genkey import genKey
 
@@ -198,10 +290,3 @@ if __name__ == "__main__":
         prng.addExternalEntropy()
         prng.add_entropy(genKey(userdata, prng.impl.random_bytes(32)))
         genRandomInteractive(prng, options.lang)
-
-    # """
-    # data = getRandomData(256*1024*1024)
-    # f = open("random1.dat","w")
-    # f.write(data)
-    # f.close()
-    # """
@@ -28,8 +28,19 @@ while v:
 # final 8 bits are a checksum
 w[-1] |= sha256(h).digest()[0]
 
-# English wordlist
-wl = '''\
+# English wordlist, read from the shared text resource when available (nothing is written to disk),
+# the inline copy below otherwise
+try:
+    import os
+    import wordlist
+    wl = wordlist.readTextWords(os.path.join(wordlist.baseDir, "wordlists", "bip39-english.txt"))
+    if len(wl) != 2048:
+        raise ValueError("bad English word list")
+except (ImportError, OSError, ValueError):
+    wl = None
+
+if wl is None:
+    wl = '''\
 abandon ability able about above absent absorb abstract absurd abuse access
 accident account accuse achieve acid acoustic acquire across act action actor
 actress actual adapt add addict address adjust admit adult advance advice
@@ -2,9 +2,19 @@
 # coding=utf-8
 
 from prng import Prng
+from gf256 import ShamirGF256
 import optparse
 import binascii
+import collections
 import getpass
+import functools
+import itertools
+import multiprocessing
+import math
+import random
+import struct
+import sys
+import time
 import bip39
 from utils import *
 
@@ -21,17 +31,18 @@ widthSets = [
     (192, 2 ** 192 - 237),
     (224, 2 ** 224 - 63),
     (256, 2 ** 256 - 189),
-    (384, 2 ** 256 - 317),
+    (384, 2 ** 384 - 317),
     (512, 2 ** 512 - 569),
 ]
 
 
 class Shamir:
 
-    def __init__(self, k, n, width):
+    def __init__(self, k, n, width, xBits=16):
         self.k = k
         self.n = n
         self.width = width
+        self.xBits = xBits
         self.P = 0
 
         for widthSet in widthSets:
@@ -42,27 +53,44 @@ class Shamir:
         if self.P == 0:
             raise ValueError("incorrect width: %d" % width)
 
+        if n >= min(1 << xBits, self.P):
+            raise ValueError("too many shares for %d-bit x coordinates: %d" % (xBits, n))
+
     @staticmethod
     def fPoly(x, poly, prime):
+        """ Horner's rule, reduced mod prime at every step """
         result = 0
-        for i in range(len(poly)):
-            result += poly[i] * x ** i
-        return result % prime
+        for coefficient in reversed(poly):
+            result = (result * x + coefficient) % prime
+        return result
+
+    @staticmethod
+    def fPolyMany(xs, poly, prime):
+        """ fPoly for all xs, one pass over the coefficients """
+        result = [0] * len(xs)
+        for coefficient in reversed(poly):
+            result = [(y * x + coefficient) % prime for (y, x) in zip(result, xs)]
+        return result
 
     @staticmethod
     def bezout(a, b):
         """ Calcule (u, v, p) tels que a*u + b*v = p et p = pgcd(a, b) """
-        if a == 0 and b == 0:
+        # iterative form of the recursive extended Euclid, same (u, v) results
+        quotients = []
+        while b != 0:
+            quotients.append(a // b)
+            (a, b) = (b, a % b)
+        if a == 0:
             return 0, 0, 0
-        if b == 0:
-            return a // abs(a), 0, abs(a)
-        (u, v, p) = Shamir.bezout(b, a % b)
-        return v, (u - v * (a // b)), p
+        (u, v, p) = (a // abs(a), 0, abs(a))
+        for q in reversed(quotients):
+            (u, v) = (v, u - v * q)
+        return u, v, p
 
     @staticmethod
     def inv(x, m):
         """ Calcule y dans [[0, m-1]] tel que x*y % m == 1 """
-        return Shamir.bezout(x, m)[0] % m
+        return pow(x, -1, m)
 
     def split(self, secret, deterministic=True):
 
@@ -72,59 +100,226 @@ class Shamir:
         prng = Prng(deterministic=deterministic)
         prng.add_entropy(secret.to_bytes(512, byteorder="big"))
 
-        a = [0] * self.k
+        a = [secret] + [r % self.P for r in prng.getRandomLongs(512, self.k - 1)]
+
+        x = self.drawX(prng)
 
-        a[0] = secret
+        y = Shamir.fPolyMany(x, a, self.P)
 
-        for i in range(1, self.k):
-            a[i] = prng.getRandomLong(512) % self.P
+        return list(zip(x, y))
 
+    def drawX(self, prng):
+        """ n distinct non-zero x coordinates of xBits bits, smaller than P """
         x = []
+        seen = set()
+
+        if self.xBits == 16:
+            # legacy stream: one DRBG request per draw
+            def draw():
+                return prng.getRandomLong(16)
+        else:
+            def draw():
+                return prng.getRandomBits(self.xBits)
 
         for i in range(self.n):
             while True:
-                r = int(prng.getRandomLong(16))
-                if r != 0 and r not in x:
+                r = draw()
+                if r != 0 and r < self.P and r not in seen:
                     x += [r]
+                    seen.add(r)
                     break
 
-        y = [0] * self.n
+        return x
+
+    def splitBlocks(self, blocks, x, prng):
+        """
+        Generator over the y coordinates (one list per block) of a sequence of secrets sharing the
+        x coordinates x. Each block is mixed into prng before its coefficients are drawn.
+        """
+        for block in blocks:
+            if block >= self.P:
+                raise ValueError("secret must be smaller than P")
+            prng.add_entropy(block.to_bytes(512, byteorder="big"))
+            a = [block] + [r % self.P for r in prng.getRandomLongs(512, self.k - 1)]
+            yield Shamir.fPolyMany(x, a, self.P)
+
+    def split_many(self, secrets, deterministic=True):
+        """
+        Splits several secrets for the same n holders: one set of x coordinates is drawn and the
+        powers of each x are computed once, every y is then a dot product with the coefficients.
+        Returns one share list per secret, share i of every list goes to holder i.
+        """
+        for secret in secrets:
+            if secret >= self.P:
+                raise ValueError("secret must be smaller than P")
 
-        for i in range(self.n):
-            y[i] = Shamir.fPoly(x[i], a, self.P)
+        prng = Prng(deterministic=deterministic)
+        for secret in secrets:
+            prng.add_entropy(secret.to_bytes(512, byteorder="big"))
+
+        x = self.drawX(prng)
+
+        powers = []
+        for xi in x:
+            row = [1] * self.k
+            for j in range(1, self.k):
+                row[j] = row[j - 1] * xi % self.P
+            powers.append(row)
+
+        result = []
+        for secret in secrets:
+            prng.add_entropy(secret.to_bytes(512, byteorder="big"))
+            a = [secret] + [r % self.P for r in prng.getRandomLongs(512, self.k - 1)]
+            result.append([(xi, sum(c * p for (c, p) in zip(a, row)) % self.P) for (xi, row) in zip(x, powers)])
+        return result
 
-        shares = []
+    def combine_many(self, shareSets):
+        """
+        Combines several secrets split for the same holders: the x coordinates of the first k shares
+        of the first set are used for every set, so the Lagrange coefficients are computed once.
+        """
+        if not shareSets:
+            return []
+        if len(shareSets[0]) < self.k:
+            raise ValueError("need %d shares, got %d" % (self.k, len(shareSets[0])))
+        xs = tuple(share[0] for share in shareSets[0][:self.k])
+        coefficients = Shamir.lagrange(xs, self.P)
+        result = []
+        for shares in shareSets:
+            points = dict(shares)
+            if any(x not in points for x in xs):
+                raise ValueError("share sets do not come from the same holders")
+            result.append(sum(points[x] * c for (x, c) in zip(xs, coefficients)) % self.P)
+        return result
 
-        for i in range(self.n):
-            shares += [(x[i], y[i])]
+    @staticmethod
+    def batchInv(values, m):
+        """ Inverses of all values mod m with a single inversion (Montgomery's trick) """
+        prefix = [1] * (len(values) + 1)
+        for i in range(len(values)):
+            prefix[i + 1] = prefix[i] * values[i] % m
+        acc = Shamir.inv(prefix[-1], m)
+        result = [0] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            result[i] = acc * prefix[i] % m
+            acc = acc * values[i] % m
+        return result
 
-        return shares
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def lagrange(xs, prime):
+        """ Lagrange coefficients at 0 for the x coordinates xs (a tuple), cached """
+        if len(set(x % prime for x in xs)) != len(xs):
+            raise ValueError("duplicate x coordinate in shares")
+        nums = [1] * len(xs)
+        dens = [1] * len(xs)
+        for i in range(len(xs)):
+            for j in range(len(xs)):
+                if i != j:
+                    nums[i] = nums[i] * xs[j] % prime
+                    dens[i] = dens[i] * (xs[j] - xs[i]) % prime
+        return tuple(num * inv % prime for (num, inv) in zip(nums, Shamir.batchInv(dens, prime)))
 
     def combine(self, shares):
 
-        sx = [0] * self.k
-        sy = [0] * self.k
-        secret = 0
+        if len(shares) < self.k:
+            raise ValueError("need %d shares, got %d" % (self.k, len(shares)))
 
-        for i in range(self.k):
-            sx[i] = shares[i][0]
-            sy[i] = shares[i][1]
+        xs = tuple(share[0] for share in shares[:self.k])
+        ys = [share[1] for share in shares[:self.k]]
 
-        for i in range(self.k):
-            num = 1
-            den = 1
-            for j in range(self.k):
-                if i != j:
-                    num *= sx[j]
-                    den *= sx[j] - sx[i]
-            secret += sy[i] * num * Shamir.inv(den, self.P)
+        coefficients = Shamir.lagrange(xs, self.P)
+
+        return sum(y * c for (y, c) in zip(ys, coefficients)) % self.P
+
+    @staticmethod
+    def solveMod(rows, prime):
+        """
+        One solution of the linear system given as augmented rows [a_0 .. a_m-1 | b] mod prime,
+        free variables set to 0. Returns None if the system is inconsistent.
+        """
+        rows = [list(row) for row in rows]
+        unknowns = len(rows[0]) - 1
+        pivots = []
+        r = 0
+        for c in range(unknowns):
+            pivot = next((i for i in range(r, len(rows)) if rows[i][c] % prime), None)
+            if pivot is None:
+                continue
+            (rows[r], rows[pivot]) = (rows[pivot], rows[r])
+            factor = Shamir.inv(rows[r][c], prime)
+            rows[r] = [value * factor % prime for value in rows[r]]
+            for i in range(len(rows)):
+                if i != r and rows[i][c] % prime:
+                    f = rows[i][c]
+                    rows[i] = [(a - f * b) % prime for (a, b) in zip(rows[i], rows[r])]
+            pivots.append(c)
+            r += 1
+            if r == len(rows):
+                break
+        if any(row[-1] % prime for row in rows[r:]):
+            return None
+        solution = [0] * unknowns
+        for (i, c) in enumerate(pivots):
+            solution[c] = rows[i][-1]
+        return solution
 
-        return secret % self.P
+    @staticmethod
+    def polyDivMod(num, den, prime):
+        """ (quotient, remainder) of polynomials given as coefficient lists, lowest degree first """
+        num = list(num)
+        inverse = Shamir.inv(den[-1], prime)
+        quotient = [0] * max(1, len(num) - len(den) + 1)
+        for i in range(len(num) - len(den), -1, -1):
+            q = num[i + len(den) - 1] * inverse % prime
+            quotient[i] = q
+            for j in range(len(den)):
+                num[i + j] = (num[i + j] - q * den[j]) % prime
+        return quotient, num[:len(den) - 1]
+
+    def combine_robust(self, shares):
+        """
+        Reconstructs the secret from all the given shares, tolerating corrupted ones
+        (Berlekamp-Welch decoding): up to (len(shares) - k) // 2 bad shares are corrected.
+        Returns (secret, indices of the inconsistent shares).
+        """
+        m = len(shares)
+        if m < self.k:
+            raise ValueError("need at least %d shares, got %d" % (self.k, m))
+        if len(set(x % self.P for (x, _) in shares)) != m:
+            raise ValueError("duplicate x coordinate in shares")
+        e = (m - self.k) // 2
+        # unknowns: Q (k + e coefficients) and E (e low coefficients, monic of degree e)
+        # equations: Q(x_i) - y_i * (E(x_i) - x_i^e) = y_i * x_i^e
+        rows = []
+        for (x, y) in shares:
+            powers = [1] * (self.k + e)
+            for j in range(1, self.k + e):
+                powers[j] = powers[j - 1] * x % self.P
+            xe = pow(x, e, self.P)
+            rows.append(powers + [-y * powers[j] % self.P for j in range(e)] + [y * xe % self.P])
+        solution = Shamir.solveMod(rows, self.P)
+        if solution is None:
+            raise ValueError("too many corrupted shares")
+        q = solution[:self.k + e]
+        errorLocator = solution[self.k + e:] + [1]
+        (poly, remainder) = Shamir.polyDivMod(q, errorLocator, self.P)
+        if any(remainder) or any(poly[self.k:]):
+            raise ValueError("too many corrupted shares")
+        poly = poly[:self.k]
+        bad = [i for (i, (x, y)) in enumerate(shares) if Shamir.fPoly(x, poly, self.P) != y % self.P]
+        if len(bad) > e:
+            raise ValueError("too many corrupted shares")
+        return poly[0], bad
 
 
 class ShareProtocolV1(object):
+    shareVersion = 1
+    headerSize = 4
+    maxK = 15
+
     def __init__(self, k=None, width=None, share=None, deterministic=True):
-        self.version = 1
+        self.version = self.shareVersion
         self.deterministic = deterministic
 
         if share:
@@ -134,8 +329,10 @@ class ShareProtocolV1(object):
                 raise ValueError("unknown share version: %d" % shareVersion)
 
             self.k = k
-            self.width = len(share) * 8 - 32
+            self.width = (len(share) - self.headerSize) * 8
         else:
+            if k > self.maxK:
+                raise ValueError("k too large for share version %d: %d" % (self.version, k))
             self.k = k
             self.width = width
 
@@ -159,35 +356,126 @@ class ShareProtocolV1(object):
     def decode(self, share):
         (version, k, x, y) = self.decodeAll(share)
         if version != self.version:
-            raise Exception("incompatible version in share: %d" % version)
+            raise ValueError("incompatible version in share: %d" % version)
         if k != self.k:
-            raise Exception("incompatible k in share: %d" % k)
+            raise ValueError("incompatible k in share: %d" % k)
         return (x, y)
 
+    def split(self, raw, n, deterministic=True):
+        return Shamir(k=self.k, n=n, width=self.width).split(longFromRaw(raw), deterministic)
 
-def cliSplit(k, n, secret, lang, deterministic=True):
-    formatBIP39 = False
+    def combine(self, points):
+        """ secret, as an integer, from k decoded shares """
+        return Shamir(k=self.k, n=0, width=self.width).combine(points)
 
-    while True:
-        try:
-            raw = binascii.unhexlify(secret)
-            break
-        except Exception:
-            pass
-        try:
-            raw = bip39.rawFromBIP39(secret.split())
-            formatBIP39 = True
-        except Exception:
-            raw = b"SHTF" + (len(secret)).to_bytes(1, byteorder="big") + secret.encode("utf-8")
-            len_stuff = 512 // 8 - len(raw)
-            raw += b" " * len_stuff
-        break
+    def combineRobust(self, points):
+        """ (secret, indices of corrupted shares) from k or more decoded shares """
+        return Shamir(k=self.k, n=0, width=self.width).combine_robust(points)
+
+
+class ShareProtocolV2(ShareProtocolV1):
+    """
+    Shares of the byte-wise GF(256) engine: same layout as V1 (x on 16 bits, always < 256),
+    y holds one byte per byte of the secret.
+    """
+    shareVersion = 2
+
+    def encode(self, share):
+        prng = Prng(deterministic=self.deterministic)
+        prng.add_entropy(share[0].to_bytes(512, byteorder="big") + share[1])
+        result = b""
+        result += bytes([prng.getRandomLong(8) & 0xF0 | self.version])
+        result += bytes([prng.getRandomLong(8) & 0xF0 | self.k])
+        result += rawFromLong(share[0], 16)
+        result += share[1]
+        return result
+
+    def decodeAll(self, share):
+        (version, k, x, _) = ShareProtocolV1.decodeAll(self, share)
+        return version, k, x, bytes(share[4:])
+
+    def split(self, raw, n, deterministic=True):
+        return ShamirGF256(k=self.k, n=n).split(raw, deterministic)
+
+    def combine(self, points):
+        return longFromRaw(ShamirGF256(k=self.k, n=0).combine(points))
+
+    def combineRobust(self, points):
+        (secret, bad) = ShamirGF256(k=self.k, n=0).combine_robust(points)
+        return longFromRaw(secret), bad
+
+
+class ShareProtocolV3(ShareProtocolV1):
+    """
+    Shares for large k and n: k on 16 bits, x on 32 bits.
+    layout: random nibble | version, random byte, k (u16), x (u32), y
+    """
+    shareVersion = 3
+    headerSize = 8
+    maxK = 0xFFFF
+
+    def encode(self, share):
+        prng = Prng(deterministic=self.deterministic)
+        prng.add_entropy(share[0].to_bytes(512, byteorder="big") + share[1].to_bytes(512, byteorder="big"))
+        result = b""
+        result += bytes([prng.getRandomLong(8) & 0xF0 | self.version])
+        result += bytes([prng.getRandomLong(8)])
+        result += rawFromLong(self.k, 16)
+        result += rawFromLong(share[0], 32)
+        result += rawFromLong(share[1], self.width)
+        return result
+
+    def decodeAll(self, share):
+        version = share[0] & 0x0F
+        k = longFromRaw(share[2:4])
+        x = longFromRaw(share[4:8])
+        y = longFromRaw(share[8:])
+        return version, k, x, y
+
+    def split(self, raw, n, deterministic=True):
+        return Shamir(k=self.k, n=n, width=self.width, xBits=32).split(longFromRaw(raw), deterministic)
+
+
+shareProtocols = {
+    ShareProtocolV1.shareVersion: ShareProtocolV1,
+    ShareProtocolV2.shareVersion: ShareProtocolV2,
+    ShareProtocolV3.shareVersion: ShareProtocolV3,
+}
+
+
+def protocolFromShare(raw):
+    """ Share protocol matching the version nibble of a raw share """
+    shareVersion = raw[0] & 0x0F
+    if shareVersion not in shareProtocols:
+        raise ValueError("unknown share version: %d" % shareVersion)
+    return shareProtocols[shareVersion](share=raw)
 
-    shamir = Shamir(k=k, n=n, width=len(raw) * 8)
 
-    shares = shamir.split(longFromRaw(raw), deterministic)
+def parseSecret(secret):
+    """ Returns (raw, formatBIP39) for a secret given as hex, BIP39 mnemonic or text """
+    try:
+        return binascii.unhexlify(secret), False
+    except Exception:
+        pass
+    try:
+        return bip39.rawFromBIP39(secret.split()), True
+    except Exception:
+        raw = b"SHTF" + (len(secret)).to_bytes(1, byteorder="big") + secret.encode("utf-8")
+        len_stuff = 512 // 8 - len(raw)
+        raw += b" " * len_stuff
+        return raw, False
 
-    protocol = ShareProtocolV1(k=shamir.k, width=shamir.width)
+
+def cliSplit(k, n, secret, lang, deterministic=True, protocolVersion=None):
+    (raw, formatBIP39) = parseSecret(secret)
+
+    if protocolVersion is None:
+        # version 1 shares are the most compact, but stop at k = 15 and n = 65535
+        protocolVersion = 1 if k <= ShareProtocolV1.maxK and n < 1 << 16 else 3
+
+    protocol = shareProtocols[protocolVersion](k=k, width=len(raw) * 8)
+
+    shares = protocol.split(raw, n, deterministic)
 
     encodedShares = map(protocol.encode, shares)
 
@@ -208,80 +496,341 @@ def cliShareGenerator():
         index += 1
 
 
+def decodeShare(share):
+    """ Returns (raw, formatBIP39) for a share given as hex or BIP39 mnemonic """
+    try:
+        return binascii.unhexlify(share), False
+    except:
+        return bip39.rawFromBIP39(share.split()), True
+
+
+def formatSecret(secret, width, formatBIP39, lang):
+    if formatBIP39:
+        return " ".join(bip39.BIP39FromLong(secret, width=width, lang=lang))
+    raw = rawFromLong(secret, width=width)
+    if raw.startswith(b"SHTF"):
+        len_text = raw[4]
+        return (raw[5:5 + len_text]).decode("utf-8")
+    return binascii.hexlify(raw).decode("utf-8")
+
+
 def cliCombine(shareGenerator, lang):
     protocol = None
     shares = []
 
     for share in shareGenerator():
 
-        try:
-            raw = binascii.unhexlify(share)
-            formatBIP39 = False
-        except:
-            raw = bip39.rawFromBIP39(share.split())
-            formatBIP39 = True
+        (raw, formatBIP39) = decodeShare(share)
 
         if not protocol:
-            protocol = ShareProtocolV1(share=raw)
+            protocol = protocolFromShare(raw)
 
         shares += [protocol.decode(raw)]
 
         if protocol.k == len(shares):
             break
 
-    shamir = Shamir(k=protocol.k, n=0, width=protocol.width)
+    secret = protocol.combine(shares)
 
-    secret = shamir.combine(shares)
+    return formatSecret(secret, protocol.width, formatBIP39, lang)
 
-    if formatBIP39:
-        formattedSecret = " ".join(bip39.BIP39FromLong(secret, width=protocol.width, lang=lang))
-    else:
-        raw = rawFromLong(secret, width=protocol.width)
-        if raw.startswith(b"SHTF"):
-            len_text = raw[4]
-            formattedSecret = (raw[5:5 + len_text]).decode("utf-8")
-        else:
-            formattedSecret = binascii.hexlify(raw).decode("utf-8")
 
-    return formattedSecret
+def cliCombineRobust(shareGenerator, lang):
+    """
+    Like cliCombine, but uses every share given by shareGenerator and tolerates corrupted ones:
+    shares that cannot be decoded or whose header disagrees with the majority are skipped.
+    Returns (secret, indices of the corrupted shares).
+    """
+    bad = []
+    decoded = []
+
+    for (index, share) in enumerate(shareGenerator()):
+        try:
+            (raw, formatBIP39) = decodeShare(share)
+            protocol = protocolFromShare(raw)
+        except ValueError:
+            bad.append(index)
+            continue
+        decoded.append((index, raw, formatBIP39, (protocol.version, protocol.k, protocol.width)))
+
+    if not decoded:
+        raise ValueError("no valid share")
+
+    # a corrupted header is outvoted by the shares that agree with each other
+    (header, _) = collections.Counter(item[3] for item in decoded).most_common(1)[0]
+    protocol = None
+    indices = []
+    points = []
+    formats = []
+
+    for (index, raw, formatBIP39, shareHeader) in decoded:
+        if shareHeader != header:
+            bad.append(index)
+            continue
+        if not protocol:
+            protocol = protocolFromShare(raw)
+        indices.append(index)
+        points.append(protocol.decode(raw))
+        formats.append(formatBIP39)
+
+    (secret, badPoints) = protocol.combineRobust(points)
+    bad = sorted(bad + [indices[i] for i in badPoints])
+    formatBIP39 = formats.count(True) > len(formats) // 2
 
+    return formatSecret(secret, protocol.width, formatBIP39, lang), bad
 
-def autotest(k, shares, expected):
-    n = len(shares)
-    counter = [0] * k
+
+def cliAllSharesGenerator():
+    index = 1
     while True:
-        duplicate = False
-        for i in range(k):
-            for j in range(k):
-                if i == j:
-                    continue
-                if counter[i] == counter[j]:
-                    duplicate = True
-                    break
-            if duplicate:
-                break
-        if not duplicate:
-            # print("testing {}".format(counter))
-            # selected_shares = [shares[counter[i]] for i in range(k)])
-
-            def gen_shares():
-                for i in range(k):
-                    yield shares[counter[i]]
-
-            found = cliCombine(gen_shares, lang="english")
-            if found != expected:
-                print("error: found '{}' selected_shares indices: {}".format(found, counter))
-                exit(1)
-        shall_exit = True
-        for i in range(k):
-            counter[i] += 1
-            if counter[i] == n:
-                counter[i] = 0
+        share = getpass.getpass("Share %d (hex or BIP39, empty to finish):" % index)
+        if not share:
+            return
+        yield share
+        index += 1
+
+
+def sampledSubsets(n, k, count, rng):
+    """
+    count k-subsets of range(n): a cover of disjoint subsets first (the last one completed with
+    the first shares), so that every share is used at least once, then random subsets.
+    """
+    emitted = 0
+    for start in range(0, n, k):
+        if emitted == count:
+            return
+        subset = list(range(start, min(start + k, n)))
+        subset += [i for i in range(n) if i not in subset][:k - len(subset)]
+        yield tuple(sorted(subset))
+        emitted += 1
+    while emitted < count:
+        yield tuple(sorted(rng.sample(range(n), k)))
+        emitted += 1
+
+
+def subsetChunks(n, k, chunkSize, subsets=None):
+    if subsets is None:
+        subsets = itertools.combinations(range(n), k)
+    while True:
+        chunk = list(itertools.islice(subsets, chunkSize))
+        if not chunk:
+            return
+        yield chunk
+
+
+# the pairwise Lagrange ratios of a share set are precomputed up to this many shares (n * n entries)
+maxRatioTable = 100
+
+
+def lagrangeRatios(xs, prime):
+    """
+    ratios[i][j] = x_j / (x_j - x_i) mod prime, with a single inversion: the Lagrange coefficient
+    of share i over any subset is the product of its ratios to the other shares of the subset.
+    """
+    n = len(xs)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    inverses = Shamir.batchInv([(xs[j] - xs[i]) % prime for (i, j) in pairs], prime)
+    ratios = [[1] * n for _ in range(n)]
+    for ((i, j), inverse) in zip(pairs, inverses):
+        ratios[i][j] = xs[j] * inverse % prime
+        ratios[j][i] = xs[i] * (prime - inverse) % prime
+    return ratios
+
+
+def checkSubsets(task):
+    """
+    Combines every subset of the task, returns (number checked, first subset not giving the expected secret).
+    Over a prime field the coefficients come from the ratios table when there is one, otherwise they
+    are computed for each subset without going through the (useless here) Lagrange cache.
+    """
+    (protocol, points, subsets, expected, prime, ratios) = task
+    checked = 0
+    for subset in subsets:
+        checked += 1
+        if prime is None:
+            secret = protocol.combine([points[i] for i in subset])
+        else:
+            if ratios is None:
+                coefficients = Shamir.lagrange.__wrapped__(tuple(points[i][0] for i in subset), prime)
             else:
-                shall_exit = False
-                break
-        if shall_exit:
+                coefficients = []
+                for i in subset:
+                    row = ratios[i]
+                    c = 1
+                    for j in subset:
+                        c = c * row[j] % prime
+                    coefficients.append(c)
+            secret = sum(points[i][1] * c for (i, c) in zip(subset, coefficients)) % prime
+        if secret != expected:
+            return checked, subset
+    return checked, None
+
+
+class VerificationReport(object):
+    """ Outcome of verifyShares """
+
+    def __init__(self, k, n, maxSubsets=None):
+        self.k = k
+        self.n = n
+        self.total = math.comb(n, k)
+        # over maxSubsets, only a sample of the subsets is checked
+        self.sampled = maxSubsets is not None and self.total > maxSubsets
+        if self.sampled:
+            self.total = maxSubsets
+        self.checked = 0
+        self.failedSubset = None
+        self.found = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.failedSubset is None and self.checked == self.total
+
+    @property
+    def throughput(self):
+        """ subsets checked per second """
+        return self.checked / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def verifyShares(k, shares, expected, processes=1, chunkSize=1000, progress=None, maxSubsets=None):
+    """
+    Checks that every k-subset of the shares gives back the expected secret (as typed for cliSplit)
+    and returns a VerificationReport. Each share is decoded once and subsets are taken with
+    itertools.combinations: the order of the shares does not matter.
+    When there are more than maxSubsets subsets, maxSubsets of them are checked instead: disjoint
+    subsets covering every share, then random ones (see sampledSubsets).
+    With processes > 1 chunks of subsets are spread over a process pool, which is terminated as soon
+    as a subset fails. progress(report) is called after every chunk.
+    """
+    decoded = [decodeShare(share) for share in shares]
+    protocol = protocolFromShare(decoded[0][0])
+    points = [protocol.decode(raw) for (raw, _) in decoded]
+    expectedLong = longFromRaw(parseSecret(expected)[0])
+
+    report = VerificationReport(k, len(points), maxSubsets)
+    subsets = sampledSubsets(len(points), k, report.total, random.SystemRandom()) if report.sampled else None
+    prime = None if isinstance(protocol, ShareProtocolV2) else Shamir(k=k, n=0, width=protocol.width).P
+    ratios = None
+    if prime is not None and len(points) <= maxRatioTable:
+        ratios = lagrangeRatios([x for (x, _) in points], prime)
+    tasks = ((protocol, points, chunk, expectedLong, prime, ratios)
+             for chunk in subsetChunks(len(points), k, chunkSize, subsets))
+    start = time.time()
+
+    def collect(results):
+        for (checked, failed) in results:
+            report.checked += checked
+            report.elapsed = time.time() - start
+            if failed is not None:
+                report.failedSubset = list(failed)
+                found = protocol.combine([points[i] for i in failed])
+                report.found = formatSecret(found, protocol.width, decoded[0][1], "english")
+            if progress:
+                progress(report)
+            if failed is not None:
+                return
+
+    if processes <= 1:
+        collect(map(checkSubsets, tasks))
+    else:
+        # leaving the with block terminates the workers still running
+        with multiprocessing.Pool(processes) as pool:
+            collect(pool.imap_unordered(checkSubsets, tasks))
+
+    report.elapsed = time.time() - start
+    return report
+
+
+# share files of the streaming mode:
+#   magic "SHSF" | version (u8) | k (u16) | width (u16) | x (u16), then one y per block, width / 8 bytes each
+# the input is cut into blocks of width / 8 - 1 bytes, so that every block is smaller than P, and
+# padded with 0x80 then zeros (ISO/IEC 7816-4): the last block always carries the padding
+STREAM_MAGIC = b"SHSF"
+STREAM_VERSION = 1
+streamHeaderFormat = ">4sBHHH"
+streamHeaderSize = struct.calcsize(streamHeaderFormat)
+
+
+def readPaddedBlocks(fileobj, blockSize):
+    """ Generator over the padded blocks of a file, as integers """
+    while True:
+        block = fileobj.read(blockSize)
+        if len(block) < blockSize:
+            block += b"\x80" + b"\x00" * (blockSize - len(block) - 1)
+            yield longFromRaw(block)
+            return
+        yield longFromRaw(block)
+
+
+def splitStream(k, n, infile, outfiles, width=512, deterministic=False):
+    """
+    Splits a file of any length into n share files (outfiles: binary file objects, one per holder),
+    one block at a time: memory does not depend on the input size. Returns the number of blocks.
+    """
+    if len(outfiles) != n:
+        raise ValueError("need %d output files, got %d" % (n, len(outfiles)))
+    shamir = Shamir(k=k, n=n, width=width)
+    prng = Prng(deterministic=deterministic)
+    x = shamir.drawX(prng)
+    for (outfile, xi) in zip(outfiles, x):
+        outfile.write(struct.pack(streamHeaderFormat, STREAM_MAGIC, STREAM_VERSION, k, width, xi))
+    count = 0
+    for y in shamir.splitBlocks(readPaddedBlocks(infile, width // 8 - 1), x, prng):
+        for (outfile, yi) in zip(outfiles, y):
+            outfile.write(rawFromLong(yi, width))
+        count += 1
+    return count
+
+
+def combineStream(infiles, outfile):
+    """
+    Rebuilds a file split by splitStream from at least k share files read in lockstep.
+    Returns the number of bytes written.
+    """
+    headers = []
+    for infile in infiles:
+        (magic, version, k, width, x) = struct.unpack(streamHeaderFormat, infile.read(streamHeaderSize))
+        if magic != STREAM_MAGIC:
+            raise ValueError("not a share file")
+        if version != STREAM_VERSION:
+            raise ValueError("unknown share file version: %d" % version)
+        headers.append((k, width, x))
+    (k, width) = headers[0][:2]
+    if any(header[:2] != (k, width) for header in headers):
+        raise ValueError("share files do not come from the same split")
+    if len(infiles) < k:
+        raise ValueError("need %d share files, got %d" % (k, len(infiles)))
+    shamir = Shamir(k=k, n=0, width=width)
+    xs = tuple(header[2] for header in headers[:k])
+    coefficients = Shamir.lagrange(xs, shamir.P)
+    blockSize = width // 8
+    written = 0
+    previous = None
+    while True:
+        raws = [infile.read(blockSize) for infile in infiles[:k]]
+        if not raws[0]:
             break
+        if any(len(raw) != blockSize for raw in raws):
+            raise ValueError("truncated share file")
+        secret = sum(longFromRaw(raw) * c for (raw, c) in zip(raws, coefficients)) % shamir.P
+        if previous is not None:
+            outfile.write(previous)
+            written += len(previous)
+        previous = rawFromLong(secret, width - 8)
+    if previous is None:
+        raise ValueError("empty share file")
+    end = previous.rstrip(b"\x00")
+    if not end.endswith(b"\x80"):
+        raise ValueError("bad padding, wrong or corrupted share files")
+    outfile.write(end[:-1])
+    return written + len(end) - 1
+
+
+def cliProgress(report):
+    sys.stderr.write("\rchecked %d/%d subsets (%.0f subsets/s)" % (report.checked, report.total, report.throughput))
+    if report.checked == report.total or report.failedSubset is not None:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
 
 
 if __name__ == "__main__":
@@ -308,6 +857,31 @@ if __name__ == "__main__":
                       action="store", dest="lang", default="english", type="str",
                       help="Language used for BIP39 mnemonic")
 
+    parser.add_option("-g", "--gf256",
+                      action="store_true", dest="gf256", default=False,
+                      help="Split with the byte-wise GF(256) engine (share version 2)")
+
+    parser.add_option("-r", "--robust",
+                      action="store_true", dest="robust", default=False,
+                      help="Combine all the given shares and report the corrupted ones")
+
+    parser.add_option("-i", "--input",
+                      action="store", dest="input", default=None, type="str",
+                      help="Split this file into share files <input>.share<i> (streaming mode)")
+
+    parser.add_option("-o", "--output",
+                      action="store", dest="output", default=None, type="str",
+                      help="Combine the share files given as arguments into this file (streaming mode)")
+
+    parser.add_option("-m", "--max-subsets",
+                      action="store", dest="maxSubsets", default=2000, type="int",
+                      help="Check a sample of this many k-subsets after a split when there are more "
+                           "(default: 2000, 0 checks them all)")
+
+    parser.add_option("-p", "--processes",
+                      action="store", dest="processes", default=1, type="int",
+                      help="Number of processes used to check the shares after a split")
+
     (options, args) = parser.parse_args()
 
     if options.split:
@@ -321,11 +895,26 @@ if __name__ == "__main__":
         if options.combine:
             raise Exception("cannot split and combine at the same time")
 
+        if options.input:
+            outfiles = [open("%s.share%d" % (options.input, i + 1), "wb") for i in range(options.n)]
+            with open(options.input, "rb") as infile:
+                count = splitStream(options.k, options.n, infile, outfiles)
+            for outfile in outfiles:
+                outfile.close()
+            print("%d blocks written to %s.share1..%d" % (count, options.input, options.n))
+            sys.exit(0)
+
         secret = getpass.getpass("Secret (text, hex or BIP39):")
 
-        shares = cliSplit(options.k, options.n, secret, options.lang, deterministic=False)
+        shares = cliSplit(options.k, options.n, secret, options.lang, deterministic=False,
+                          protocolVersion=2 if options.gf256 else None)
 
-        autotest(options.k, shares, secret)
+        report = verifyShares(options.k, shares, secret, processes=options.processes, progress=cliProgress,
+                              maxSubsets=options.maxSubsets or None)
+
+        if not report.ok:
+            print("error: found '{}' selected_shares indices: {}".format(report.found, report.failedSubset))
+            exit(1)
 
         for i in range(len(shares)):
             print("share %d: %s" % (i + 1, shares[i]))
@@ -341,4 +930,24 @@ if __name__ == "__main__":
         if options.n:
             raise Exception("parameter n not required")
 
-        print("secret: %s" % cliCombine(cliShareGenerator, options.lang))
+        if options.output:
+            infiles = [open(name, "rb") for name in args]
+            with open(options.output, "wb") as outfile:
+                written = combineStream(infiles, outfile)
+            for infile in infiles:
+                infile.close()
+            print("%d bytes written to %s" % (written, options.output))
+            sys.exit(0)
+
+        try:
+            if options.robust:
+                (secret, bad) = cliCombineRobust(cliAllSharesGenerator, options.lang)
+                print("secret: %s" % secret)
+                if bad:
+                    print("corrupted shares: %s" % ", ".join("%d" % (i + 1) for i in bad))
+                sys.exit(0)
+            print("secret: %s" % cliCombine(cliShareGenerator, options.lang))
+        except ValueError as e:
+            # unknown BIP39 words come with spelling suggestions
+            print("error: %s" % e)
+            exit(1)
@@ -33,6 +33,96 @@ class Test_BIP39(unittest.TestCase):
         hex = bip39.hexFromBIP39("anim admi aunt approv myst web scen east surg city infant susp".split())
         self.assertEqual(hex, "0900743d056927f1b0222dda452dcd6d", "wrong decoding of mnemonic")
 
+    def test_bip39_load_words(self):
+        for (lang, first, last) in [("english", "abandon", "zoo"), ("french", "abaisser", "zoologie")]:
+            words = bip39.loadWords(lang)
+            self.assertEqual(len(words), 2048, "wrong %s word count" % lang)
+            self.assertEqual(words[0], first)
+            self.assertEqual(words[2047], last)
+
+    def test_bip39_dict_index(self):
+        dic = bip39.BIP39Dict("english")
+        self.assertEqual(dic.indexOf("abandon"), 0)
+        self.assertEqual(dic.indexOf("act"), bip39.loadWords("english").index("act"))
+        self.assertEqual(dic.indexOf("zoo"), 2047)
+        self.assertEqual(dic.indexOf("aban"), 0)
+        self.assertEqual(dic.indexOf("abando"), 0)
+        self.assertRaises(ValueError, dic.indexOf, "aba")
+        self.assertRaises(ValueError, dic.indexOf, "abandonx")
+        self.assertRaises(ValueError, dic.indexOf, "abax")
+        self.assertTrue(dic.has("approv"))
+        self.assertFalse(dic.has("appro"[:3]))
+        self.assertIs(dic.wordIndex, bip39.BIP39Dict("english").wordIndex, "index should be shared")
+
+    def test_bip39_detect_lang(self):
+        mnemonic = bip39.BIP39FromHex("8e9b88a6428dafef2a5e102bc2e66e48", lang="french")
+        (lang, indices) = bip39.decodeMnemonic(mnemonic)
+        self.assertEqual(lang, "french")
+        self.assertEqual(indices, [bip39.BIP39Dict("french").indexOf(word) for word in mnemonic])
+        self.assertEqual(bip39.hexFromBIP39(mnemonic), "8e9b88a6428dafef2a5e102bc2e66e48")
+        self.assertEqual(bip39.detectLang("model sword civil".split()), "english")
+        self.assertRaises(ValueError, bip39.detectLang, "model sword nonexistent".split())
+
+    def test_bip39_many(self):
+        seeds = [bytes.fromhex("8e9b88a6428dafef2a5e102bc2e66e48"),
+                 bytes.fromhex("87628fa955edbcbe6cdc74087b57c95bc5d7609a00f111d5b4785f5e7bf478d7")]
+        mnemonics = bip39.encode_many(seeds)
+        self.assertEqual(mnemonics, [bip39.BIP39FromRaw(seed) for seed in seeds])
+        self.assertEqual(bip39.decode_many(mnemonics), seeds)
+
+    def test_bip39_long(self):
+        mnemonic = bip39.BIP39FromLong(0x8e9b88a6428dafef2a5e102bc2e66e48, width=128)
+        self.assertEqual(" ".join(mnemonic),
+                         "model sword civil lunar sustain wasp practice search cloth blame oppose music")
+        self.assertEqual(bip39.longFromBIP39(mnemonic), 0x8e9b88a6428dafef2a5e102bc2e66e48)
+
+    def test_bip39_bad_checksum(self):
+        mnemonic = "model sword civil lunar sustain wasp practice search cloth blame oppose oppose".split()
+        self.assertRaises(ValueError, bip39.rawFromBIP39, mnemonic)
+
+    # https://github.com/trezor/python-mnemonic/blob/master/vectors.json
+    seedVectors = [
+        ("00000000000000000000000000000000",
+         "c55257c360c07c72029aebc1b53c05ed0362ada38ead3e3e9efa3708e53495531f09a6987599d18264c1e1c92f2cf141630c7a3c4ab7c81b2f001698e7463b04"),
+        ("7f7f7f7f7f7f7f7f7f7f7f7f7f7f7f7f",
+         "2e8905819b8723fe2c1d161860e5ee1830318dbf49a83bd451cfb8440c28bd6fa457fe1296106559a3c80937a1c1069be3a3a5bd381ee6260e8d9739fce1f607"),
+        ("ffffffffffffffffffffffffffffffff",
+         "ac27495480225222079d7be181583751e86f571027b0497b5b5d11218e0a8a13332572917f0f8e5a589620c6f15b11c61dee327651a14c34e18231052e48c069"),
+        ("0000000000000000000000000000000000000000000000000000000000000000",
+         "bda85446c68413707090a52022edd26a1c9462295029f2e60cd7c4f2bbd3097170af7a4d73245cafa9c3cca8d561a7c3de6f5d4a10be8ed2a5e608d68f92fcc8"),
+    ]
+
+    def test_bip39_seed(self):
+        for (entropy, seed) in self.seedVectors:
+            mnemonic = bip39.BIP39FromHex(entropy)
+            self.assertEqual(bip39.seedFromMnemonic(mnemonic, "TREZOR").hex(), seed, "wrong seed for %s" % entropy)
+            self.assertEqual(bip39.seedFromMnemonic(" ".join(mnemonic), "TREZOR").hex(), seed)
+
+    def test_bip39_seeds_batch(self):
+        pairs = [(bip39.BIP39FromHex(entropy), "TREZOR") for (entropy, _) in self.seedVectors]
+        expected = [seed for (_, seed) in self.seedVectors]
+        self.assertEqual([seed.hex() for seed in bip39.seedsFromMnemonics(pairs, processes=2)], expected)
+        self.assertEqual([seed.hex() for seed in bip39.seedsFromMnemonics(pairs, processes=1)], expected)
+
+    def test_bip39_suggest_words(self):
+        self.assertEqual(bip39.suggestWords("swrod")[0], "sword")
+        self.assertEqual(bip39.suggestWords("modle")[0], "model")
+        self.assertEqual(bip39.suggestWords("approov")[0], "approve")
+        self.assertEqual(bip39.suggestWords("zenith", lang="french"), ["zénith"])
+        self.assertEqual(bip39.suggestWords("xqzwvy"), [])
+        self.assertLessEqual(len(bip39.suggestWords("aban", limit=3)), 3)
+
+    def test_bip39_unknown_word_suggestions(self):
+        with self.assertRaises(ValueError) as context:
+            bip39.rawFromBIP39("model swrod civil".split())
+        self.assertIn("sword", str(context.exception))
+
+    def test_edit_distance(self):
+        self.assertEqual(bip39.editDistance("sword", "sword"), 0)
+        self.assertEqual(bip39.editDistance("swrod", "sword"), 1)
+        self.assertEqual(bip39.editDistance("swod", "sword"), 1)
+        self.assertEqual(bip39.editDistance("kitten", "sitting"), 3)
+
 
 if __name__ == '__main__':
     unittest.main()
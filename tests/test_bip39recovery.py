@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import unittest
+import bip39
+import bip39recovery
+
+mnemonic = "model sword civil lunar sustain wasp practice search cloth blame oppose music".split()
+
+
+class Test_BIP39Recovery(unittest.TestCase):
+
+    def assertAllValid(self, candidates):
+        for candidate in candidates:
+            bip39.rawFromBIP39(candidate)
+
+    def test_recover_missing_word(self):
+        candidates = list(bip39recovery.recoverMnemonic(mnemonic[:5] + ["?"] + mnemonic[6:]))
+        self.assertIn(mnemonic, candidates)
+        self.assertAllValid(candidates)
+        for candidate in candidates:
+            self.assertEqual(candidate[:5] + candidate[6:], mnemonic[:5] + mnemonic[6:])
+
+    def test_recover_last_word(self):
+        candidates = list(bip39recovery.recoverMnemonic(mnemonic[:11] + [None]))
+        # 7 free bits in the last word of a 12-word mnemonic, the checksum fixes the other 4
+        self.assertEqual(len(candidates), 128)
+        self.assertIn(mnemonic, candidates)
+        self.assertAllValid(candidates)
+
+    def test_recover_garbled_word_with_candidates(self):
+        garbled = mnemonic[:3] + ["lunxr"] + mnemonic[4:]
+        candidates = list(bip39recovery.recoverMnemonic(garbled, candidates={3: ["lunar", "lunch", "luxury"]}))
+        self.assertIn(mnemonic, candidates)
+        for candidate in candidates:
+            self.assertIn(candidate[3], ["lunar", "lunch", "luxury"])
+
+    def test_recover_fuzzy(self):
+        garbled = mnemonic[:3] + ["lunr"] + mnemonic[4:]
+        candidates = list(bip39recovery.recoverMnemonic(garbled, fuzzy=True))
+        self.assertIn(mnemonic, candidates)
+        self.assertLess(len(candidates), 10)
+
+    def test_recover_two_words_parallel(self):
+        damaged = mnemonic[:2] + ["?"] + mnemonic[3:9] + ["?"] + mnemonic[10:]
+        candidates = {2: bip39.loadWords("english")[:50] + ["civil"]}
+        sequential = list(bip39recovery.recoverMnemonic(damaged, candidates=candidates))
+        parallel = list(bip39recovery.recoverMnemonic(damaged, candidates=candidates, processes=2))
+        self.assertIn(mnemonic, sequential)
+        self.assertEqual(sequential, parallel)
+        self.assertAllValid(sequential)
+
+    def test_recover_streams_candidates(self):
+        damaged = mnemonic[:2] + ["?"] + mnemonic[3:9] + ["?"] + mnemonic[10:]
+        for processes in [1, 2]:
+            candidates = bip39recovery.recoverMnemonic(damaged, processes=processes)
+            first = next(candidates)
+            candidates.close()
+            self.assertAllValid([first])
+            self.assertEqual(first[:2] + first[3:9] + first[10:], damaged[:2] + damaged[3:9] + damaged[10:])
+
+    def test_recover_french(self):
+        french = bip39.BIP39FromHex("8e9b88a6428dafef2a5e102bc2e66e48", lang="french")
+        candidates = list(bip39recovery.recoverMnemonic(french[:11] + ["?"]))
+        self.assertIn(french, candidates)
+
+    def test_recover_french_garbled_word(self):
+        french = bip39.BIP39FromHex("8e9b88a6428dafef2a5e102bc2e66e48", lang="french")
+        garbled = french[:3] + ["izzadier"] + french[4:]
+        self.assertEqual(bip39recovery.detectLang(garbled), "french")
+        self.assertIn(french, list(bip39recovery.recoverMnemonic(garbled, fuzzy=True)))
+        candidates = list(bip39recovery.recoverMnemonic(garbled))
+        self.assertIn(french, candidates)
+        self.assertAllValid(candidates)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import unittest
+import itertools
+import gf256
+
+
+def slowMul(a, b):
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= gf256.POLYNOMIAL
+        b >>= 1
+    return result
+
+
+class Test_GF256(unittest.TestCase):
+
+    def test_tables(self):
+        for a in range(256):
+            for b in range(256):
+                self.assertEqual(gf256.mul(a, b), slowMul(a, b))
+        for a in range(1, 256):
+            self.assertEqual(gf256.mul(a, gf256.div(1, a)), 1)
+        self.assertRaises(ZeroDivisionError, gf256.div, 1, 0)
+
+    def test_scale_bytes(self):
+        data = bytes(range(256))
+        for c in [0, 1, 2, 0x53, 0xFF]:
+            self.assertEqual(gf256.scaleBytes(data, c), bytes(slowMul(c, b) for b in data))
+
+    def test_split_combine(self):
+        secret = bytes.fromhex("d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250")
+        shamir = gf256.ShamirGF256(k=3, n=6)
+        shares = shamir.split(secret)
+        self.assertEqual(shares, shamir.split(secret), "split should be deterministic")
+        self.assertEqual(len(set(x for (x, _) in shares)), 6)
+        for subset in itertools.permutations(shares, 3):
+            self.assertEqual(shamir.combine(list(subset)), secret)
+        self.assertNotEqual(gf256.ShamirGF256(k=2, n=0).combine(shares[:2]), secret, "k - 1 shares leak the secret")
+        self.assertRaises(ValueError, shamir.combine, shares[:2])
+
+    def test_combine_robust(self):
+        secret = bytes.fromhex("d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250")
+        shamir = gf256.ShamirGF256(k=3, n=8)
+        shares = shamir.split(secret)
+        self.assertEqual(shamir.combine_robust(shares), (secret, []))
+        corrupted = list(shares)
+        corrupted[2] = (shares[2][0], bytes([shares[2][1][0] ^ 1]) + shares[2][1][1:])
+        corrupted[6] = (shares[6][0], bytes(b ^ 0x5A for b in shares[6][1]))
+        self.assertEqual(shamir.combine_robust(corrupted), (secret, [2, 6]))
+        corrupted[0] = (shares[0][0], bytes(b ^ 0xFF for b in shares[0][1]))
+        self.assertRaises(ValueError, shamir.combine_robust, corrupted)
+        self.assertRaises(ValueError, shamir.combine_robust, shares[:2])
+
+    def test_limits(self):
+        self.assertRaises(ValueError, gf256.ShamirGF256, 3, 256)
+        self.assertRaises(ValueError, gf256.ShamirGF256(k=2, n=3).combine, [(1, b"a"), (1, b"b")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import unittest
+import hashlib
+import hmac
+from hmac_drbg import HmacDrbg
+
+
+class ReferenceHmacDrbg(HmacDrbg):
+    """ Re-keys HMAC on every call and generates with the plain NIST loop, without the cached template """
+
+    def hmac(self, val):
+        return hmac.new(self.key, val, hashlib.sha512).digest()
+
+    def random_bytes(self, length):
+        result = b""
+        while len(result) < length:
+            self.val = hmac.new(self.key, self.val, hashlib.sha512).digest()
+            result += self.val
+        return result[:length]
+
+
+class Test_HmacDrbg(unittest.TestCase):
+
+    def test_cached_key_matches_reference(self):
+        drbg = HmacDrbg(seed=b"seed")
+        reference = ReferenceHmacDrbg(seed=b"seed")
+        for entropy in [b"", b"a", b"entropy" * 20]:
+            drbg.add_entropy(entropy)
+            reference.add_entropy(entropy)
+            for length in [0, 1, 63, 64, 65, 1000]:
+                self.assertEqual(drbg.random_bytes(length), reference.random_bytes(length),
+                                 "cached HMAC key diverges from reference")
+        self.assertEqual(drbg.key, reference.key, "key state diverges")
+        self.assertEqual(drbg.val, reference.val, "value state diverges")
+
+    def test_advance_matches_discarded_output(self):
+        for blocks in [0, 1, 2, 100]:
+            drbg = HmacDrbg(seed=b"seed")
+            reference = HmacDrbg(seed=b"seed")
+            drbg.advance(blocks)
+            reference.random_bytes(64 * blocks)
+            self.assertEqual(drbg.random_bytes(100), reference.random_bytes(100),
+                             "advance() diverges from discarded output")
+
+    def test_random_bytes_into_matches_random_bytes(self):
+        for length in [0, 1, 64, 65, 1000]:
+            drbg = HmacDrbg(seed=b"seed")
+            reference = HmacDrbg(seed=b"seed")
+            buffer = bytearray(length)
+            self.assertEqual(drbg.random_bytes_into(buffer), length)
+            self.assertEqual(bytes(buffer), reference.random_bytes(length),
+                             "random_bytes_into() diverges from random_bytes()")
+            self.assertEqual(drbg.val, reference.val, "value state diverges")
+
+    def test_random_bytes_into_memoryview(self):
+        drbg = HmacDrbg(seed=b"seed")
+        reference = HmacDrbg(seed=b"seed")
+        buffer = bytearray(200)
+        drbg.random_bytes_into(memoryview(buffer)[50:150])
+        self.assertEqual(bytes(buffer[50:150]), reference.random_bytes(100))
+        self.assertEqual(bytes(buffer[:50]) + bytes(buffer[150:]), bytes(100), "wrote outside the view")
+
+
+if __name__ == '__main__':
+    unittest.main()
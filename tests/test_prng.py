@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import unittest
+from io import BytesIO
+import prng as prngmodule
 from prng import Prng
 
 
@@ -19,6 +21,71 @@ class Test_Prng(unittest.TestCase):
         expected = 1783747816
         self.assertEqual(value, expected, "Prng not deterministic (expected: %d, got: %d)" % (expected, value))
 
+    def test_getRandomLongs_matches_getRandomLong(self):
+        for nBits in [0, 8, 32, 512, 1024]:
+            prng1 = Prng(deterministic=True)
+            prng2 = Prng(deterministic=True)
+            values = prng1.getRandomLongs(nBits, 5)
+            expected = [prng2.getRandomLong(nBits) for _ in range(5)]
+            self.assertEqual(values, expected, "batch diverges from single draws (%d bits)" % nBits)
+            self.assertEqual(prng1.getRandomLong(32), prng2.getRandomLong(32), "stream position diverges")
+
+    def test_get_random_integer_v1_stream(self):
+        prng1 = Prng(deterministic=True)
+        prng2 = Prng(deterministic=True)
+        value = prng1.get_random_integer(257)
+        while True:
+            expected = prng2.getRandomLong(16)
+            if expected < 257:
+                break
+        self.assertEqual(value, expected, "legacy sampling stream changed")
+
+    def test_get_random_integers_v2(self):
+        prng = Prng(deterministic=True, samplingVersion=prngmodule.samplingV2)
+        values = prng.get_random_integers(257, 10000)
+        self.assertEqual(len(values), 10000)
+        self.assertTrue(all(0 <= v < 257 for v in values), "value out of range")
+        self.assertEqual(len(set(values)), 257, "some values never drawn")
+        self.assertEqual(prng.get_random_integers(1, 3), [0, 0, 0])
+
+    def test_get_random_integers_v2_deterministic(self):
+        prng1 = Prng(deterministic=True, samplingVersion=prngmodule.samplingV2)
+        prng2 = Prng(deterministic=True, samplingVersion=prngmodule.samplingV2)
+        values = prng1.get_random_integers(10 ** 40, 10)
+        expected = [prng2.get_random_integer(10 ** 40) for _ in range(10)]
+        self.assertEqual(values, expected, "batch diverges from single draws")
+
+    def test_get_random_integer_v2_reservoir(self):
+        prng = Prng(deterministic=True, samplingVersion=prngmodule.samplingV2)
+        for _ in range(64):
+            prng.get_random_integer(256)
+        self.assertEqual(prng.round, 1, "8-bit samples should share one DRBG block")
+
+    def test_skip_matches_random_bytes(self):
+        for nBytes in [1, 64, 65, 6400]:
+            prng1 = Prng(deterministic=True)
+            prng2 = Prng(deterministic=True)
+            prng1.skip(nBytes)
+            prng2.random_bytes(nBytes)
+            self.assertEqual(prng1.getRandomLong(32), prng2.getRandomLong(32),
+                             "skip(%d) diverges from random_bytes(%d)" % (nBytes, nBytes))
+
+    def test_write_stream(self):
+        prng1 = Prng(deterministic=True)
+        prng2 = Prng(deterministic=True)
+        stream = BytesIO()
+        written = prng1.write_stream(stream, 1000, chunk_size=128)
+        self.assertEqual(written, 1000)
+        self.assertEqual(stream.getvalue(), prng2.random_bytes(1000), "streamed output diverges")
+
+    def test_write_stream_bad_chunk_size(self):
+        prng = Prng(deterministic=True)
+        self.assertRaises(ValueError, prng.write_stream, BytesIO(), 1000, 100)
+
+    def test_get_words_password_1(self):
+        password = prngmodule.get_words_password(123456789012345678901234567890)
+        self.assertEqual(password, "cannas nimbera saunent roman (64 bits)", "wrong password: %s" % password)
+
 
 if __name__ == '__main__':
     unittest.main()
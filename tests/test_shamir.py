@@ -3,6 +3,11 @@
 import unittest
 import shamir
 import binascii
+import os
+import random
+import subprocess
+import sys
+from io import BytesIO
 
 
 class Test_Prng(unittest.TestCase):
@@ -134,6 +139,286 @@ class Test_Prng(unittest.TestCase):
                         self.assertEqual(secretOutput, secret,
                                          "secret was not retrieved for shares %d %d %d" % (i1, i2, i3))
 
+    def test_shamir_fPoly(self):
+        for (width, prime) in shamir.widthSets:
+            poly = [(prime - 1 - i * 12345) % prime for i in range(15)]
+            xs = [1, 2, 65535, 40000]
+            expected = [sum(poly[i] * x ** i for i in range(len(poly))) % prime for x in xs]
+            self.assertEqual([shamir.Shamir.fPoly(x, poly, prime) for x in xs], expected)
+            self.assertEqual(shamir.Shamir.fPolyMany(xs, poly, prime), expected)
+
+    def test_shamir_batchInv(self):
+        for (width, prime) in shamir.widthSets:
+            values = [1, 2, 3, prime - 1, 65535, (prime - 1) // 3]
+            inverses = shamir.Shamir.batchInv(values, prime)
+            self.assertEqual(inverses, [shamir.Shamir.inv(v, prime) for v in values])
+            for (v, i) in zip(values, inverses):
+                self.assertEqual(v * i % prime, 1)
+
+    def test_shamir_combine_lagrange_cache(self):
+        shamir1 = shamir.Shamir(k=3, n=5, width=128)
+        secrets = [123456789, 987654321]
+        splits = [shamir1.split(secret) for secret in secrets]
+        for (secret, shares) in zip(secrets, splits):
+            self.assertEqual(shamir1.combine(shares[1:4]), secret)
+        xs = tuple(x for (x, _) in splits[0][1:4])
+        self.assertEqual(shamir.Shamir.lagrange(xs, shamir1.P), shamir.Shamir.lagrange(xs, shamir1.P))
+        self.assertGreater(shamir.Shamir.lagrange.cache_info().hits, 0)
+
+    def test_shamir_combine_duplicate_share(self):
+        shamir1 = shamir.Shamir(k=2, n=3, width=128)
+        shares = shamir1.split(42)
+        self.assertRaises(ValueError, shamir1.combine, [shares[0], shares[0]])
+
+    def recursiveBezout(self, a, b):
+        if a == 0 and b == 0:
+            return 0, 0, 0
+        if b == 0:
+            return a // abs(a), 0, abs(a)
+        (u, v, p) = self.recursiveBezout(b, a % b)
+        return v, (u - v * (a // b)), p
+
+    def test_shamir_combine_too_few_shares(self):
+        shamir1 = shamir.Shamir(k=3, n=5, width=128)
+        shares = shamir1.split(123456)
+        self.assertRaises(ValueError, shamir1.combine, shares[:2])
+        self.assertEqual(shamir1.combine(shares[2:]), 123456)
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 5, secret, lang="english")
+        self.assertRaises(ValueError, shamir.cliCombine, lambda: iter(shares[:2]), "english")
+
+    def test_shamir_inv_property(self):
+        rng = random.Random(1)
+        for (width, prime) in shamir.widthSets:
+            for _ in range(50):
+                x = rng.randrange(1, prime)
+                y = shamir.Shamir.inv(x, prime)
+                self.assertEqual(x * y % prime, 1, "wrong inverse of %d mod %d" % (x, prime))
+                self.assertEqual(y, shamir.Shamir.bezout(x, prime)[0] % prime)
+                self.assertEqual(shamir.Shamir.inv(-x, prime), (-y) % prime)
+
+    def test_shamir_bezout_property(self):
+        rng = random.Random(2)
+        for (width, prime) in shamir.widthSets:
+            for _ in range(50):
+                a = rng.randrange(-prime, prime)
+                b = rng.choice([prime, rng.randrange(-prime, prime)])
+                (u, v, p) = shamir.Shamir.bezout(a, b)
+                self.assertEqual((u, v, p), self.recursiveBezout(a, b))
+                self.assertEqual(a * u + b * v, p)
+        self.assertEqual(shamir.Shamir.bezout(0, 0), (0, 0, 0))
+        self.assertEqual(shamir.Shamir.bezout(-6, 0), (-1, 0, 6))
+
+    def test_shamir_inv_not_invertible(self):
+        self.assertRaises(ValueError, shamir.Shamir.inv, 0, 2 ** 32 - 5)
+
+    def test_shamir_verify_shares(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 6, secret, lang="english")
+        report = shamir.verifyShares(3, shares, secret)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.checked, report.total), (20, 20))
+        reports = []
+        report = shamir.verifyShares(3, shares, secret, processes=2, chunkSize=4, progress=reports.append)
+        self.assertTrue(report.ok)
+        self.assertEqual(len(reports), 5)
+        mnemonic = "model sword civil lunar sustain wasp practice search cloth blame oppose music"
+        self.assertTrue(shamir.verifyShares(2, shamir.cliSplit(2, 4, mnemonic, lang="french"), mnemonic).ok)
+        self.assertTrue(shamir.verifyShares(2, shamir.cliSplit(2, 4, "hello world!", lang="english"),
+                                            "hello world!").ok)
+
+    def test_shamir_verify_shares_failure(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 6, secret, lang="english")
+        for processes in [1, 2]:
+            report = shamir.verifyShares(3, shares, "00" * 32, processes=processes, chunkSize=2)
+            self.assertFalse(report.ok)
+            self.assertEqual(len(report.failedSubset), 3)
+            self.assertEqual(report.found, secret)
+            self.assertLess(report.checked, report.total)
+
+    def streamSplit(self, data, k, n, width=512):
+        outfiles = [BytesIO() for _ in range(n)]
+        shamir.splitStream(k, n, BytesIO(data), outfiles, width=width, deterministic=True)
+        return [outfile.getvalue() for outfile in outfiles]
+
+    def test_shamir_stream_round_trip(self):
+        for width in [128, 512]:
+            blockSize = width // 8 - 1
+            for length in [0, 1, blockSize - 1, blockSize, blockSize + 1, 10 * blockSize + 7]:
+                data = bytes((i * 7 + length) % 256 for i in range(length))
+                shareFiles = self.streamSplit(data, 3, 5, width)
+                for selected in [[0, 1, 2], [4, 2, 0], [1, 3, 4, 0]]:
+                    output = BytesIO()
+                    written = shamir.combineStream([BytesIO(shareFiles[i]) for i in selected], output)
+                    self.assertEqual(output.getvalue(), data, "stream round trip failed (%d bytes)" % length)
+                    self.assertEqual(written, length)
+
+    def test_shamir_stream_errors(self):
+        shareFiles = self.streamSplit(b"secret data" * 10, 3, 4)
+        self.assertRaises(ValueError, shamir.combineStream, [BytesIO(f) for f in shareFiles[:2]], BytesIO())
+        truncated = [BytesIO(f) for f in shareFiles[:2]] + [BytesIO(shareFiles[2][:-1])]
+        self.assertRaises(ValueError, shamir.combineStream, truncated, BytesIO())
+        self.assertRaises(ValueError, shamir.combineStream, [BytesIO(b"XXXX" + f[4:]) for f in shareFiles], BytesIO())
+        self.assertRaises(ValueError, shamir.splitStream, 3, 4, BytesIO(b""), [BytesIO()] * 3)
+
+    def test_shamir_cli_gf256(self):
+        for secret in ["d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250",
+                       "model sword civil lunar sustain wasp practice search cloth blame oppose music",
+                       "hello world!"]:
+            shares = shamir.cliSplit(3, 5, secret, lang="english", protocolVersion=2)
+            self.assertNotEqual(shares, shamir.cliSplit(3, 5, secret, lang="english"))
+            for subset in [(0, 1, 2), (4, 2, 1), (3, 0, 4)]:
+                secretOutput = shamir.cliCombine(lambda: (shares[i] for i in subset), lang="english")
+                self.assertEqual(secretOutput, secret, "secret was not retrieved for shares %s" % (subset,))
+            self.assertTrue(shamir.verifyShares(3, shares, secret).ok)
+
+    def test_shamir_unknown_share_version(self):
+        self.assertRaises(ValueError, shamir.protocolFromShare, bytes.fromhex("0f03000100"))
+
+    def test_shamir_split_many(self):
+        for (width, prime) in shamir.widthSets:
+            shamir1 = shamir.Shamir(k=3, n=5, width=width)
+            secrets = [0, 1, prime - 1, prime // 3, 123456789]
+            shareSets = shamir1.split_many(secrets)
+            self.assertEqual(len(shareSets), len(secrets))
+            xs = [x for (x, _) in shareSets[0]]
+            for shares in shareSets:
+                self.assertEqual([x for (x, _) in shares], xs, "holders should share x coordinates")
+            for holders in [[0, 1, 2], [4, 2, 3]]:
+                selected = [[shares[i] for i in holders] for shares in shareSets]
+                self.assertEqual(shamir1.combine_many(selected), secrets)
+                self.assertEqual([shamir1.combine(shares) for shares in selected], secrets)
+            self.assertEqual(shamir1.split_many(secrets), shareSets, "split_many should be deterministic")
+
+    def test_shamir_combine_many_mismatch(self):
+        shamir1 = shamir.Shamir(k=2, n=3, width=128)
+        shareSets = shamir1.split_many([1, 2])
+        self.assertRaises(ValueError, shamir1.combine_many, [shareSets[0][:2], shareSets[1][1:]])
+        self.assertEqual(shamir1.combine_many([]), [])
+        self.assertRaises(ValueError, shamir1.combine_many, [shareSets[0][:1], shareSets[1][:1]])
+
+    def test_shamir_cli_large_k(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(20, 40, secret, lang="english")
+        self.assertEqual(shamir.protocolFromShare(bytes.fromhex(shares[0])).version, 3)
+        for subset in [range(20), range(20, 40), range(1, 40, 2)]:
+            secretOutput = shamir.cliCombine(lambda: (shares[i] for i in subset), lang="english")
+            self.assertEqual(secretOutput, secret)
+        mnemonic = "model sword civil lunar sustain wasp practice search cloth blame oppose music"
+        shares = shamir.cliSplit(16, 16, mnemonic, lang="english")
+        self.assertEqual(shamir.cliCombine(lambda: iter(shares), lang="english"), mnemonic)
+
+    def test_shamir_lagrange_ratios(self):
+        shamir1 = shamir.Shamir(k=3, n=6, width=256)
+        xs = [x for (x, _) in shamir1.split(42)]
+        ratios = shamir.lagrangeRatios(xs, shamir1.P)
+        for subset in [(0, 1, 2), (1, 3, 5), (2, 4, 5)]:
+            expected = shamir.Shamir.lagrange(tuple(xs[i] for i in subset), shamir1.P)
+            coefficients = []
+            for i in subset:
+                c = 1
+                for j in subset:
+                    c = c * ratios[i][j] % shamir1.P
+                coefficients.append(c)
+            self.assertEqual(tuple(coefficients), expected)
+
+    def test_shamir_verify_shares_without_ratios(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 6, secret, lang="english")
+        maxRatioTable = shamir.maxRatioTable
+        try:
+            shamir.maxRatioTable = 0
+            self.assertTrue(shamir.verifyShares(3, shares, secret).ok)
+            self.assertFalse(shamir.verifyShares(3, shares, "00" * 32).ok)
+        finally:
+            shamir.maxRatioTable = maxRatioTable
+
+    def test_shamir_verify_shares_sampled(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(20, 45, secret, lang="english")
+        report = shamir.verifyShares(20, shares, secret, maxSubsets=50)
+        self.assertTrue(report.sampled)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.total, report.checked), (50, 50))
+        cover = list(shamir.sampledSubsets(45, 20, 3, random.Random(1)))
+        self.assertEqual(set().union(*cover), set(range(45)))
+        self.assertTrue(all(len(set(subset)) == 20 for subset in cover))
+        self.assertFalse(shamir.verifyShares(3, shamir.cliSplit(3, 5, secret, lang="english"), secret,
+                                             maxSubsets=50).sampled)
+
+    def test_shamir_cli_split_large_k(self):
+        # no controlling terminal: getpass falls back to stdin
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        result = subprocess.run([sys.executable, "shamir.py", "-s", "-k", "20", "-n", "40", "-m", "100"],
+                                cwd=os.path.dirname(os.path.abspath(shamir.__file__)), input=secret + "\n",
+                                capture_output=True, text=True, timeout=120, start_new_session=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("checked 100/100 subsets", result.stderr)
+        shares = [line.split(": ")[1] for line in result.stdout.splitlines() if line.startswith("share ")]
+        self.assertEqual(len(shares), 40)
+        self.assertEqual(shamir.cliCombine(lambda: iter(shares[20:]), lang="english"), secret)
+
+    def test_shamir_protocol_limits(self):
+        self.assertRaises(ValueError, shamir.ShareProtocolV1, k=16, width=256)
+        self.assertRaises(ValueError, shamir.Shamir, 2, 65536, 256)
+        self.assertEqual(shamir.ShareProtocolV3(k=1000, width=256).k, 1000)
+
+    def test_shamir_drawX_large_n(self):
+        prng = shamir.Prng(deterministic=True)
+        x = shamir.Shamir(k=2, n=5000, width=32, xBits=32).drawX(prng)
+        self.assertEqual(len(set(x)), 5000)
+        self.assertTrue(all(0 < xi < 2 ** 32 - 5 for xi in x))
+        x = shamir.Shamir(k=2, n=3000, width=128).drawX(shamir.Prng(deterministic=True))
+        self.assertEqual(len(set(x)), 3000)
+        self.assertTrue(all(0 < xi < 2 ** 16 for xi in x))
+
+    def test_shamir_combine_robust(self):
+        shamir1 = shamir.Shamir(k=3, n=7, width=256)
+        secret = shamir.longFromRaw(bytes.fromhex("d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"))
+        shares = shamir1.split(secret, deterministic=True)
+        self.assertEqual(shamir1.combine_robust(shares), (secret, []))
+        corrupted = list(shares)
+        for i in [1, 5]:
+            corrupted[i] = (shares[i][0], (shares[i][1] + 12345) % shamir1.P)
+        self.assertEqual(shamir1.combine_robust(corrupted), (secret, [1, 5]))
+        corrupted[0] = (shares[0][0], shares[0][1] ^ 1)
+        self.assertRaises(ValueError, shamir1.combine_robust, corrupted)
+        self.assertRaises(ValueError, shamir1.combine_robust, shares[:2])
+
+    def test_shamir_combine_robust_50(self):
+        shamir1 = shamir.Shamir(k=10, n=50, width=512)
+        shares = shamir1.split(424242, deterministic=True)
+        bad = list(range(0, 40, 2))
+        corrupted = [(x, (y + i + 1) % shamir1.P) if i in bad else (x, y) for (i, (x, y)) in enumerate(shares)]
+        self.assertEqual(shamir1.combine_robust(corrupted), (424242, bad))
+
+    def test_shamir_cli_combine_robust(self):
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 6, secret, lang="english")
+        shares[2] = shares[2][:-1] + ("0" if shares[2][-1] != "0" else "1")
+        self.assertEqual(shamir.cliCombineRobust(lambda: iter(shares), lang="english"), (secret, [2]))
+        shares = shamir.cliSplit(3, 6, secret, lang="english", protocolVersion=2)
+        shares[4] = shares[4][:-1] + ("0" if shares[4][-1] != "0" else "1")
+        self.assertEqual(shamir.cliCombineRobust(lambda: iter(shares), lang="english"), (secret, [4]))
+
+    def test_shamir_cli_combine_robust_bad_encoding(self):
+        mnemonic = "model sword civil lunar sustain wasp practice search cloth blame oppose music"
+        shares = shamir.cliSplit(3, 6, mnemonic, lang="english")
+        words = shares[1].split()
+        words[3] = "abandon" if words[3] != "abandon" else "ability"
+        shares[1] = " ".join(words)
+        self.assertRaises(ValueError, shamir.decodeShare, shares[1])
+        self.assertEqual(shamir.cliCombineRobust(lambda: iter(shares), lang="english"), (mnemonic, [1]))
+        secret = "d9708cc98974eb52db969e3f8d3e6b13cbfc02d274baaa5c8b2e32ecdbe3b250"
+        shares = shamir.cliSplit(3, 8, secret, lang="english")
+        shares[0] = shares[0][:3] + ("7" if shares[0][3] != "7" else "8") + shares[0][4:]
+        shares[4] = shares[4][:-1] + ("0" if shares[4][-1] != "0" else "1")
+        shares[5] = "not a share"
+        self.assertEqual(shamir.cliCombineRobust(lambda: iter(shares), lang="english"), (secret, [0, 4, 5]))
+        protocol = shamir.protocolFromShare(bytes.fromhex(shares[1]))
+        self.assertRaises(ValueError, protocol.decode, bytes.fromhex(shares[0]))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import subprocess
+import sys
+import time
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# wall-clock budget for starting an entry point up to its option parsing
+startupBudget = 1.0
+
+
+class Test_Startup(unittest.TestCase):
+
+    def run_python(self, *args):
+        start = time.time()
+        subprocess.run([sys.executable] + list(args), cwd=baseDir, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.time() - start
+
+    def test_startup_budget(self):
+        for script in ["shamir.py", "bip39.py", "prng.py"]:
+            elapsed = self.run_python(script, "--help")
+            self.assertLess(elapsed, startupBudget, "%s took %.3f s to start" % (script, elapsed))
+
+    def test_no_word_list_loaded_on_import(self):
+        self.run_python("-c", "import sys, shamir, bip39, prng\n"
+                              "assert 'bip39words' not in sys.modules\n"
+                              "assert not bip39.words")
+
+
+if __name__ == '__main__':
+    unittest.main()
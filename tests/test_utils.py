@@ -19,5 +19,20 @@ class Test_Utils(unittest.TestCase):
 """
 
 
+class Test_Utils(unittest.TestCase):
+
+    def test_rawFromLong_1(self):
+        raw = utils.rawFromLong(0x0102, 32)
+        self.assertEqual(raw, b"\x00\x00\x01\x02", "wrong raw value: %s" % binascii.hexlify(raw))
+
+    def test_rawFromLong_truncates(self):
+        raw = utils.rawFromLong(0x123456, 16)
+        self.assertEqual(raw, b"\x34\x56", "wrong raw value: %s" % binascii.hexlify(raw))
+
+    def test_longFromRaw_1(self):
+        value = utils.longFromRaw(binascii.unhexlify("0102030405"))
+        self.assertEqual(value, 0x0102030405, "wrong value: %x" % value)
+
+
 if __name__ == '__main__':
     unittest.main()
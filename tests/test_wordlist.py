@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import wordlist
+import prng
+
+
+class Test_WordList(unittest.TestCase):
+
+    def test_french_words_match_split(self):
+        expected = open(os.path.join(wordlist.baseDir, "mots_francais.txt"), encoding="utf-8").read().split("\n")
+        words = wordlist.getWordList("french")
+        self.assertEqual(len(words), len(expected), "wrong word count")
+        for index in [0, 1, 1000, len(expected) - 1]:
+            self.assertEqual(words[index], expected[index], "wrong word at %d" % index)
+        self.assertEqual(words[-1], expected[-1])
+        self.assertRaises(IndexError, words.__getitem__, len(expected))
+        self.assertTrue(words.verify(), "content hash mismatch")
+
+    def test_loaded_once(self):
+        self.assertIs(wordlist.getWordList("french"), wordlist.getWordList("french"))
+
+    def test_compile_round_trip(self):
+        source = ["un", "", "deux", "é", "deuxième", ""]
+        words = wordlist.WordList(wordlist.compileWords(source))
+        self.assertEqual(list(words), source)
+        self.assertEqual(words.index("deux"), 2)
+        self.assertEqual(words.index("é"), 3)
+        self.assertEqual(words.index(""), 1)
+        self.assertNotIn("deu", words)
+        self.assertNotIn("eux", words)
+        self.assertTrue(words.verify(), "content hash mismatch")
+
+    def test_unknown_word_list(self):
+        self.assertRaises(ValueError, wordlist.getWordList, "klingon")
+
+    def test_bad_magic(self):
+        data = b"XXXX" + wordlist.compileWords(["a"])[4:]
+        self.assertRaises(ValueError, wordlist.WordList, data)
+
+    def replaceFile(self, path, data):
+        # never truncate a file that may still be memory-mapped
+        with open(path + ".test", "wb") as f:
+            f.write(data)
+        os.replace(path + ".test", path)
+
+    def test_stale_cache_recompiled(self):
+        wordlist.getWordList("french")
+        path = wordlist.compiledPath("french")
+        if not os.path.exists(path):
+            self.skipTest("word list cache is not writable")
+        expected = list(wordlist.getWordList("french")[:3])
+        sourceStat = os.stat(os.path.join(wordlist.baseDir, "mots_francais.txt"))
+        try:
+            # newer than the source but built from other words
+            wordlist.wordLists.pop("french")
+            self.replaceFile(path, wordlist.compileWords(["faux"]))
+            os.utime(path, (sourceStat.st_atime + 3600, sourceStat.st_mtime + 3600))
+            self.assertEqual(list(wordlist.getWordList("french")[:3]), expected)
+            # matching source stamp but corrupted blob
+            wordlist.wordLists.pop("french")
+            data = bytearray(wordlist.compileWords(["faux"], sourceStat.st_size, sourceStat.st_mtime_ns))
+            data[-1] ^= 1
+            self.replaceFile(path, data)
+            self.assertEqual(list(wordlist.getWordList("french")[:3]), expected)
+        finally:
+            wordlist.wordLists.pop("french", None)
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
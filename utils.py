@@ -1,19 +1,12 @@
 #!/usr/bin/env python3
 
-version = "0.1.0"
+version = "0.2.0"
 
 
 def rawFromLong(longValue, width=256):
-    buffer = longValue
-    result = b""
-    for i in range(width // 8):
-        result += bytes([buffer & 0xFF])
-        buffer >>= 8
-    return result[::-1]
+    nBytes = width // 8
+    return (longValue & ((1 << (nBytes * 8)) - 1)).to_bytes(nBytes, byteorder="big")
 
 
 def longFromRaw(raw):
-    buffer = 0
-    for char in raw:
-        buffer = (buffer << 8) | char
-    return buffer
+    return int.from_bytes(raw, byteorder="big")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import mmap
+import struct
+import hashlib
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+
+version = "v0.2.0"
+
+baseDir = os.path.dirname(os.path.abspath(__file__))
+cacheDir = os.path.join(baseDir, ".wordlist-cache")
+
+# compiled word list layout (little endian):
+#   magic "CWWL" | format version (u16) | reserved (u16) | word count (u32) | sha256 of blob (32 bytes)
+#   | source size (u64) | source mtime in ns (u64)
+#   offsets: word count + 1 u32, start of each word in blob (last one is len(blob) + 1)
+#   blob: UTF-8 words joined by "\n"
+MAGIC = b"CWWL"
+FORMAT_VERSION = 2
+headerFormat = "<4sHHI32sQQ"
+headerSize = struct.calcsize(headerFormat)
+
+registry = {}
+wordLists = {}
+
+
+class WordList(Sequence):
+    """
+    Read-only list of words stored in the compiled format, usually memory-mapped.
+    Words are decoded on access, nothing proportional to the list size is built in Python.
+    """
+
+    def __init__(self, data):
+        (magic, formatVersion, _, count, digest, sourceSize, sourceMtime) = struct.unpack_from(headerFormat, data)
+        if magic != MAGIC:
+            raise ValueError("bad word list magic")
+        if formatVersion != FORMAT_VERSION:
+            raise ValueError("unknown word list format version: %d" % formatVersion)
+        self.data = data
+        self.count = count
+        self.digest = digest
+        self.sourceSize = sourceSize
+        self.sourceMtime = sourceMtime
+        end = headerSize + 4 * (count + 1)
+        if sys.byteorder == "little":
+            self.offsets = memoryview(data)[headerSize:end].cast("I")
+        else:
+            self.offsets = array("I", data[headerSize:end])
+            self.offsets.byteswap()
+        self.blob = memoryview(data)[end:]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("word index out of range: %d" % index)
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1] - 1], "utf-8")
+
+    def index(self, word, start=0, stop=None):
+        needle = word.encode("utf-8")
+        base = len(self.data) - len(self.blob)
+        pos = self.data.find(needle, base)
+        while pos != -1:
+            pos -= base
+            index = bisect_right(self.offsets, pos) - 1
+            if self.offsets[index] == pos and self.offsets[index + 1] - 1 == pos + len(needle):
+                if index >= start and (stop is None or index < stop):
+                    return index
+            pos = self.data.find(needle, base + pos + 1)
+        raise ValueError("%s is not in word list" % word)
+
+    def __contains__(self, word):
+        try:
+            self.index(word)
+            return True
+        except ValueError:
+            return False
+
+    def verify(self):
+        """ Checks the blob against the content hash stored in the header """
+        return hashlib.sha256(self.blob).digest() == self.digest
+
+
+def compileWords(words, sourceSize=0, sourceMtime=0):
+    blob = "\n".join(words).encode("utf-8")
+    offsets = array("I", [0])
+    for word in words[:-1]:
+        offsets.append(offsets[-1] + len(word.encode("utf-8")) + 1)
+    offsets.append(len(blob) + 1)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    header = struct.pack(headerFormat, MAGIC, FORMAT_VERSION, 0, len(words), hashlib.sha256(blob).digest(),
+                         sourceSize, sourceMtime)
+    return header + offsets.tobytes() + blob
+
+
+def registerWordList(name, source, loader):
+    """
+    Registers a word list: loader(path) returns the list of words read from source,
+    a file next to this module. It only runs when the compiled form is missing or stale.
+    """
+    registry[name] = (source, loader)
+    wordLists.pop(name, None)
+
+
+def registerTextWordList(name, source):
+    """ Registers a plain text word list, one word per line """
+    registerWordList(name, source, readTextWords)
+
+
+def readTextWords(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().split("\n")
+
+
+def compiledPath(name):
+    return os.path.join(cacheDir, name + ".cwwl")
+
+
+def mapFile(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def getWordList(name):
+    """ Returns the process-wide WordList registered as name, compiling it on first use """
+    if name in wordLists:
+        return wordLists[name]
+    if name not in registry:
+        raise ValueError("unknown word list: %s" % name)
+    (source, loader) = registry[name]
+    sourcePath = os.path.join(baseDir, source)
+    path = compiledPath(name)
+    sourceStat = os.stat(sourcePath)
+    wordList = None
+    try:
+        # the compiled list records the size and mtime of the source it was built from
+        wordList = WordList(mapFile(path))
+        if (wordList.sourceSize, wordList.sourceMtime) != (sourceStat.st_size, sourceStat.st_mtime_ns) \
+                or not wordList.verify():
+            wordList = None
+    except (OSError, ValueError, struct.error):
+        wordList = None
+    if wordList is None:
+        data = compileWords(loader(sourcePath), sourceStat.st_size, sourceStat.st_mtime_ns)
+        try:
+            os.makedirs(cacheDir, exist_ok=True)
+            tmpPath = "%s.%d.tmp" % (path, os.getpid())
+            with open(tmpPath, "wb") as f:
+                f.write(data)
+            os.replace(tmpPath, path)
+            wordList = WordList(mapFile(path))
+        except OSError:
+            # read-only install: keep the compiled list in memory
+            wordList = WordList(data)
+    wordLists[name] = wordList
+    return wordList
+